@@ -27,6 +27,10 @@
 
 import pyperclip as pc
 
+from byte_io import iter_blocks
+from tana_chunks import add_chunk_arguments, check_chunk_arguments, copy_chunks
+from transform_cli import add_file_arguments, make_parser, run, run_file
+
 def add_numbers_to_paragraphs(text):
     lines = text.splitlines()
     new_text = "%%tana%%\n"
@@ -34,7 +38,27 @@ def add_numbers_to_paragraphs(text):
         new_text += f"- {i}. {line}\n"
     return new_text
 
+def add_numbers_to_paragraphs_bytes(data):
+    """
+    Bytes version of add_numbers_to_paragraphs for file input, without
+    decoding. Yields the output a block at a time.
+    """
+    yield b"%%tana%%\n"
+    number = 1
+    for block in iter_blocks(data):
+        lines = block.splitlines()
+        yield b"".join([b"- %d. %s\n" % (i, line) for i, line in enumerate(lines, start=number)])
+        number += len(lines)
+
 def main():
+    parser = add_chunk_arguments(add_file_arguments(make_parser("Number each line of the clipboard as a Tana bullet.")))
+    args = parser.parse_args()
+    check_chunk_arguments(parser, args)
+
+    if args.input:
+        run_file(args, "add_numbers", add_numbers_to_paragraphs_bytes, add_numbers_to_paragraphs)
+        return
+
     # Retrieve text from clipboard
     text = pc.paste()
     
@@ -43,7 +67,11 @@ def main():
         return
     
     # Process the text
-    modified_text = add_numbers_to_paragraphs(text)
+    modified_text = run(args, "add_numbers", add_numbers_to_paragraphs, text)
+
+    if args.chunks:
+        copy_chunks(modified_text, args.max_nodes, args.max_bytes)
+        return
     
     # Copy the modified text back to clipboard
     pc.copy(modified_text)
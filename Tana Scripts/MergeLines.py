@@ -1,7 +1,7 @@
 import pyperclip as pc
 
-
-text = pc.paste()
+from byte_io import iter_blocks, join_lines
+from transform_cli import add_file_arguments, make_parser, run, run_file
 
 
 def MergeLines(text):
@@ -16,6 +16,37 @@ def MergeLines(text):
     return mergedText
 
 
-mergedText = MergeLines(text)
-# print(mergedText)
-pc.copy(mergedText)
+def merge_lines_bytes(data):
+    """
+    Bytes version of MergeLines for file input, without decoding. Yields the
+    merged line in chunks.
+    """
+    # Trailing whitespace is held back until more text follows, so the
+    # result ends like MergeLines' rstrip().
+    pending = b""
+    blocks = (b" ".join(block.splitlines()) for block in iter_blocks(data))
+    for chunk in join_lines(blocks, b" "):
+        stripped = chunk.rstrip()
+        if stripped:
+            yield pending + stripped
+            pending = chunk[len(stripped) :]
+        else:
+            pending += chunk
+
+
+def main():
+    args = add_file_arguments(make_parser("Merge the lines on the clipboard into one line.")).parse_args()
+
+    if args.input:
+        run_file(args, "merge_lines", merge_lines_bytes, MergeLines)
+        return
+
+    text = pc.paste()
+
+    mergedText = run(args, "merge_lines", MergeLines, text)
+    # print(mergedText)
+    pc.copy(mergedText)
+
+
+if __name__ == "__main__":
+    main()
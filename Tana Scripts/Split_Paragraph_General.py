@@ -3,6 +3,9 @@
 import re
 import pyperclip
 
+from Split_Paragraph_Generalv2 import PARALLEL_THRESHOLD, process_text_parallel
+from transform_cli import make_parser, run
+
 
 def split_on_dash(text, separator="- "):
     """
@@ -41,25 +44,46 @@ def normalise_spaces(text):
     # return "".join(" " if unicodedata.category(c) == "Zs" else c for c in text)
 
 
+def process_text(text):
+    """
+    Normalises the text and splits it on dashes or into sentences.
+
+    Returns:
+        tuple: (is_dash_list, combined_text), or None if the text is empty.
+    """
+    if len(text) >= PARALLEL_THRESHOLD:
+        # Large input: same result, computed across a process pool.
+        return process_text_parallel(text, separators=["- "])
+
+    text = normalise_spaces(text)
+    if not text.strip():
+        return None
+
+    if contains_dash_list(text, separator="- "):
+        # Apply dash splitting
+        items = split_on_dash(text, separator="- ")
+        return True, "\n".join(items)
+    # Apply sentence splitting
+    return False, split_sentences(text)
+
+
 def main():
+    args = make_parser("Split the clipboard on dashes or into sentences, one per line.").parse_args()
+
     # Step 1: Get the text from the clipboard
     text = pyperclip.paste()
-    text = normalise_spaces(text)
 
-    if not text.strip():
+    # Step 2: Detect which splitting method to use and apply it
+    result = run(args, "split_paragraph_general", process_text, text)
+    if result is None:
         print("Clipboard is empty. Please copy some text and try again.")
         return
 
-    # Step 2: Detect which splitting method to use
-    if contains_dash_list(text, separator="- "):
-        print("Detected dash-separated list. Applying dash splitting...")
-        # Apply dash splitting
-        items = split_on_dash(text, separator="- ")
-        combined_text = "\n".join(items)
+    is_dash_list, combined_text = result
+    if is_dash_list:
+        print("Detected dash-separated list. Applied dash splitting.")
     else:
-        print("Dash-separated list not detected. Applying sentence splitting...")
-        # Apply sentence splitting
-        combined_text = split_sentences(text)
+        print("Dash-separated list not detected. Applied sentence splitting.")
 
     # Step 3: Copy the updated text back to the clipboard
     pyperclip.copy(combined_text)
@@ -1,12 +1,23 @@
 #!/opt/homebrew/bin/python3
 
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
 import pyperclip
 
+from transform_cli import make_parser, run
+
 # Define the list of characters/strings to use for splitting.
 # Add more characters here as needed.
 LIST_SEPARATORS = ["- ", "• "]
 MIN_SEPARATOR_COUNT = 2  # Change threshold if desired
+PARALLEL_THRESHOLD = 4_000_000  # Characters; larger inputs are split across processes
+CHUNK_SIZE = 1_000_000  # Target characters per chunk in parallel mode
+
+# A safe chunk boundary sits between two non-space characters: no whitespace
+# run, and so no sentence break, can straddle it.
+SAFE_BOUNDARY = re.compile(r"(?<=\S)(?=\S)")
 
 
 def split_on_separators(text, separators):
@@ -42,25 +53,133 @@ def normalise_spaces(text):
     return re.sub(r"\s+", " ", text)
 
 
+def process_text(text, separators=LIST_SEPARATORS):
+    """
+    Normalises the text and splits it into list items or sentences.
+
+    Returns:
+        tuple: (is_list, combined_text), or None if the text is empty.
+    """
+    text = normalise_spaces(text)
+    if not text.strip():
+        return None
+    if contains_list_separator(text, separators):
+        return True, "\n".join(split_on_separators(text, separators))
+    return False, split_sentences(text)
+
+
+def _separator_straddles(text, cut, separators):
+    # Separators are matched after normalisation, so compare against the
+    # normalised text on either side of the cut.
+    longest = max(map(len, separators))
+    reach = longest
+    while True:
+        left = normalise_spaces(text[max(cut - reach, 0) : cut])
+        right = normalise_spaces(text[cut : cut + reach])
+        if (len(left) >= longest or reach >= cut) and (len(right) >= longest or cut + reach >= len(text)):
+            break
+        reach *= 2
+    around = left + right
+    return any(
+        around.startswith(sep, start) for sep in separators for start in range(max(len(left) - len(sep) + 1, 0), len(left))
+    )
+
+
+def find_chunk_boundaries(text, separators, chunk_size=CHUNK_SIZE):
+    """
+    Returns offsets in the raw text where it can be cut into chunks of about
+    chunk_size characters without changing the result of process_text.
+
+    Each cut is between two non-space characters and not inside a separator,
+    so whitespace runs, separators and sentence breaks all fall within one chunk.
+    """
+    boundaries = [0]
+    position = chunk_size
+    while position < len(text):
+        match = SAFE_BOUNDARY.search(text, position)
+        if match is None:
+            break
+        cut = match.start()
+        if _separator_straddles(text, cut, separators):
+            position = cut + 1
+            continue
+        boundaries.append(cut)
+        position = cut + chunk_size
+    boundaries.append(len(text))
+    return boundaries
+
+
+def _count_chunk(job):
+    chunk, separators = job
+    chunk = normalise_spaces(chunk)
+    return bool(chunk.strip()), [chunk.count(sep) for sep in separators]
+
+
+def _split_chunk(job):
+    chunk, separators, is_list = job
+    chunk = normalise_spaces(chunk)
+    if is_list:
+        # Unstripped pieces, so items cut by a chunk boundary can be rejoined.
+        return re.split("|".join(map(re.escape, separators)), chunk)
+    return split_sentences(chunk)
+
+
+def process_text_parallel(text, separators=LIST_SEPARATORS, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Same result as process_text, with the work spread over a process pool.
+
+    The raw text is cut at safe boundaries and each chunk is normalised in a
+    worker. The list-or-sentences decision is made from the summed separator
+    counts of every chunk, then the chunks are split and stitched back in order.
+    """
+    boundaries = find_chunk_boundaries(text, separators, chunk_size)
+    chunks = [text[start:end] for start, end in zip(boundaries, boundaries[1:])]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        counted = list(pool.map(_count_chunk, [(chunk, separators) for chunk in chunks]))
+        if not any(has_text for has_text, _ in counted):
+            return None
+        totals = [sum(counts) for counts in zip(*(counts for _, counts in counted))]
+        is_list = any(total >= MIN_SEPARATOR_COUNT for total in totals)
+        outputs = pool.map(_split_chunk, [(chunk, separators, is_list) for chunk in chunks])
+
+        if not is_list:
+            return False, "".join(outputs)
+
+        items = []
+        for pieces in outputs:
+            if items:
+                # The last item of one chunk continues into the next chunk.
+                items[-1] += pieces[0]
+                items.extend(pieces[1:])
+            else:
+                items = pieces
+    return True, "\n".join(item.strip() for item in items if item.strip())
+
+
 def main():
+    args = make_parser("Split the clipboard into list items or sentences, one per line.").parse_args()
+
     # Step 1: Get the text from the clipboard
     text = pyperclip.paste()
-    text = normalise_spaces(text)
 
-    if not text.strip():
+    # Step 2: Detect which splitting method to use and apply it
+    if len(text) >= PARALLEL_THRESHOLD:
+        print(f"Large input. Splitting across {os.cpu_count()} processes...")
+        result = run(args, "split_paragraph", process_text_parallel, text, LIST_SEPARATORS)
+    else:
+        # Past the latency budget, split across processes after all.
+        result = run(args, "split_paragraph", process_text, text, LIST_SEPARATORS, fallback=process_text_parallel)
+
+    if result is None:
         print("Clipboard is empty. Please copy some text and try again.")
         return
 
-    # Step 2: Detect which splitting method to use
-    if contains_list_separator(text, LIST_SEPARATORS):
-        print("Detected list separators. Applying multi-character splitting...")
-        # Apply splitting on any of the defined list separators
-        items = split_on_separators(text, LIST_SEPARATORS)
-        combined_text = "\n".join(items)
+    is_list, combined_text = result
+    if is_list:
+        print("Detected list separators. Applied multi-character splitting.")
     else:
-        print("List separators not detected. Applying sentence splitting...")
-        # Apply sentence splitting
-        combined_text = split_sentences(text)
+        print("List separators not detected. Applied sentence splitting.")
 
     # Step 3: Copy the updated text back to the clipboard
     pyperclip.copy(combined_text)
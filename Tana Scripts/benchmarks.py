@@ -0,0 +1,577 @@
+#!/opt/homebrew/bin/python3
+
+# Scaling benchmarks for the transforms. Each benchmark runs at several input
+# sizes and reports the time, the throughput and the fitted scaling exponent
+# (about 1.0 means linear time).
+#
+#   python benchmarks.py                  run everything
+#   python benchmarks.py split_paragraphs run one benchmark
+#   python benchmarks.py --save data.json also write the measurements, e.g. as
+#                                         scaling data for latency.py
+
+import argparse
+import json
+import math
+import re
+import time
+
+from latency import scaling_exponent
+from script_loader import load_script
+
+MB = 1_000_000
+
+# name -> (setup function, input sizes in characters)
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes):
+    """
+    Registers a benchmark. The decorated function takes an input size and
+    returns a zero-argument callable; only that callable is timed.
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = (setup, sizes)
+        return setup
+
+    return register
+
+
+def _repeat_to(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+@benchmark("split_paragraphs", [1 * MB, 2 * MB, 5 * MB, 10 * MB])
+def bench_split_paragraphs(size):
+    module = load_script("split after ?.py")
+    line = _repeat_to("Is this the question we wanted to ask? Some answer text follows. ", size)
+    return lambda: module.split_paragraphs(line)
+
+
+@benchmark("split_paragraphs_no_terminator", [1 * MB, 2 * MB, 5 * MB, 10 * MB])
+def bench_split_paragraphs_no_terminator(size):
+    module = load_script("split after ?.py")
+    line = _repeat_to("a long line without any question mark in it ", size)
+    return lambda: module.split_paragraphs(line)
+
+
+@benchmark("split_paragraphs_legacy_no_terminator", [2_000, 4_000, 8_000, 16_000])
+def bench_split_paragraphs_legacy(size):
+    # The original findall/sub pair, for comparison: quadratic without a "?".
+    line = _repeat_to("a long line without any question mark in it ", size)
+
+    def legacy():
+        parts = [match.strip() for match in re.findall(r"[^?]+?\?", line)]
+        remaining = re.sub(r"[^?]+?\?\s*", "", line).strip()
+        if remaining:
+            parts.append(remaining)
+        return parts
+
+    return legacy
+
+
+@benchmark("paragraph_split_serial", [5 * MB, 10 * MB, 20 * MB])
+def bench_paragraph_split_serial(size):
+    import Split_Paragraph_Generalv2 as module
+
+    text = _repeat_to("A sentence of a transcript.\n  Another one follows here! ", size)
+    return lambda: module.process_text(text)
+
+
+@benchmark("paragraph_split_parallel", [5 * MB, 10 * MB, 20 * MB])
+def bench_paragraph_split_parallel(size):
+    # Imported by name, not load_script, so worker processes can find it.
+    import Split_Paragraph_Generalv2 as module
+
+    text = _repeat_to("A sentence of a transcript.\n  Another one follows here! ", size)
+    return lambda: module.process_text_parallel(text)
+
+
+MARKDOWN_BLOCK = """# Project {n}
+Overview of the project.
+## Goals:
+- ship the first version
+- keep it simple:
+  - fewer moving parts
+  - no new services
+**Risks**
+1. schedule
+2. budget
+```python
+print("hello")
+```
+"""
+
+
+def _markdown_document(size):
+    blocks = []
+    length = 0
+    while length < size:
+        blocks.append(MARKDOWN_BLOCK.format(n=len(blocks)))
+        length += len(blocks[-1])
+    return "".join(blocks)
+
+
+@benchmark("markdown_parse", [250_000, 500_000, 1 * MB])
+def bench_markdown_parse(size):
+    import markdown_to_tana_paste as module
+
+    text = _markdown_document(size)
+    return lambda: module.MarkdownToTanaConverter(text).parse()
+
+
+@benchmark("markdown_convert_colons", [250_000, 500_000, 1 * MB])
+def bench_markdown_convert_colons(size):
+    # End to end, parse and TanaRenderer: the colons and bold lines need the tree.
+    import markdown_to_tana_paste as module
+
+    text = _markdown_document(size)
+    return lambda: module.convert_markdown(text)
+
+
+def _bench_render(size, renderer_classes):
+    import io
+
+    import markdown_to_tana_paste as module
+
+    root = module.MarkdownToTanaConverter(_markdown_document(size)).parse()
+    return lambda: module.render_tree(root, [cls(io.StringIO()) for cls in renderer_classes])
+
+
+# Rendering an already parsed tree with one to four backends; the differences
+# between these rows are the marginal cost of each extra format.
+@benchmark("markdown_render_tana", [250_000, 500_000, 1 * MB])
+def bench_render_tana(size):
+    import markdown_to_tana_paste as module
+
+    return _bench_render(size, [module.TanaRenderer])
+
+
+@benchmark("markdown_render_tana_opml", [250_000, 500_000, 1 * MB])
+def bench_render_tana_opml(size):
+    import markdown_to_tana_paste as module
+
+    return _bench_render(size, [module.TanaRenderer, module.OPMLRenderer])
+
+
+@benchmark("markdown_render_tana_opml_json", [250_000, 500_000, 1 * MB])
+def bench_render_tana_opml_json(size):
+    import markdown_to_tana_paste as module
+
+    return _bench_render(size, [module.TanaRenderer, module.OPMLRenderer, module.JSONRenderer])
+
+
+@benchmark("markdown_render_all", [250_000, 500_000, 1 * MB])
+def bench_render_all(size):
+    import markdown_to_tana_paste as module
+
+    return _bench_render(size, [module.TanaRenderer, module.OPMLRenderer, module.JSONRenderer, module.PlainTextRenderer])
+
+
+def _bullet_document(size, seed=0):
+    # Nested lists, headings, quotes and code, without colons or bold headings.
+    import random
+
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        choice = rng.random()
+        if choice < 0.05:
+            line = "#" * rng.randint(1, 4) + f" Heading {len(lines)}"
+        elif choice < 0.07:
+            line = "```sh\necho one\n  echo two\n```"
+        elif choice < 0.1:
+            line = f"> quoted {len(lines)}"
+        elif choice < 0.15:
+            line = ""
+        else:
+            indent = " " * (2 * rng.randint(0, 3))
+            marker = rng.choice(["- ", "* ", "1. ", ""])
+            line = f"{indent}{marker}item {len(lines)} with some words"
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+@benchmark("markdown_convert_fast_path", [250_000, 500_000, 1 * MB])
+def bench_convert_fast_path(size):
+    import markdown_to_tana_paste as module
+
+    text = _bullet_document(size)
+    return lambda: module.convert_markdown(text)
+
+
+@benchmark("markdown_convert_tree_path", [250_000, 500_000, 1 * MB])
+def bench_convert_tree_path(size):
+    # The same documents forced through the tree, for comparison.
+    import io
+
+    import markdown_to_tana_paste as module
+
+    text = _bullet_document(size)
+    return lambda: module.MarkdownToTanaConverter(text).render(module.TanaRenderer(io.StringIO()))
+
+
+def _file_document(size, seed=0):
+    # Mixed prose, colons, questions and Markdown lines, with CRLF line breaks.
+    import random
+
+    rng = random.Random(seed)
+    pieces = ["Title: some description", "Is it done? Not yet.  Why? ", "- item", "  1. step", "plain words", "", " "]
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(pieces) + f" {len(lines)}"
+        lines.append(line)
+        length += len(line) + 2
+    return "\r\n".join(lines).encode("utf-8")
+
+
+def _bench_file_transform(size, script, text_name, bytes_name, as_bytes):
+    # File mode end to end: either decode, transform and encode, or stay bytes.
+    module = load_script(script)
+    data = _file_document(size)
+    if as_bytes:
+        transform = getattr(module, bytes_name)
+        return lambda: b"".join(transform(data))
+    transform = getattr(module, text_name)
+    return lambda: transform(data.decode("utf-8")).encode("utf-8")
+
+
+@benchmark("merge_lines_file_text", [5 * MB, 10 * MB, 20 * MB])
+def bench_merge_lines_file_text(size):
+    return _bench_file_transform(size, "MergeLines.py", "MergeLines", "merge_lines_bytes", as_bytes=False)
+
+
+@benchmark("merge_lines_file_bytes", [5 * MB, 10 * MB, 20 * MB])
+def bench_merge_lines_file_bytes(size):
+    return _bench_file_transform(size, "MergeLines.py", "MergeLines", "merge_lines_bytes", as_bytes=True)
+
+
+@benchmark("add_numbers_file_text", [5 * MB, 10 * MB, 20 * MB])
+def bench_add_numbers_file_text(size):
+    return _bench_file_transform(
+        size,
+        "Add Numbers to paragraphs.py",
+        "add_numbers_to_paragraphs",
+        "add_numbers_to_paragraphs_bytes",
+        as_bytes=False,
+    )
+
+
+@benchmark("add_numbers_file_bytes", [5 * MB, 10 * MB, 20 * MB])
+def bench_add_numbers_file_bytes(size):
+    return _bench_file_transform(
+        size,
+        "Add Numbers to paragraphs.py",
+        "add_numbers_to_paragraphs",
+        "add_numbers_to_paragraphs_bytes",
+        as_bytes=True,
+    )
+
+
+@benchmark("split_after_colon_file_text", [5 * MB, 10 * MB, 20 * MB])
+def bench_split_after_colon_file_text(size):
+    return _bench_file_transform(
+        size,
+        "split after colon.py",
+        "process_text_no_duplicates",
+        "process_text_no_duplicates_bytes",
+        as_bytes=False,
+    )
+
+
+@benchmark("split_after_colon_file_bytes", [5 * MB, 10 * MB, 20 * MB])
+def bench_split_after_colon_file_bytes(size):
+    return _bench_file_transform(
+        size,
+        "split after colon.py",
+        "process_text_no_duplicates",
+        "process_text_no_duplicates_bytes",
+        as_bytes=True,
+    )
+
+
+@benchmark("split_after_question_file_text", [5 * MB, 10 * MB, 20 * MB])
+def bench_split_after_question_file_text(size):
+    return _bench_file_transform(
+        size,
+        "split after ?.py",
+        "process_text_with_nesting",
+        "process_text_with_nesting_bytes",
+        as_bytes=False,
+    )
+
+
+@benchmark("split_after_question_file_bytes", [5 * MB, 10 * MB, 20 * MB])
+def bench_split_after_question_file_bytes(size):
+    return _bench_file_transform(
+        size,
+        "split after ?.py",
+        "process_text_with_nesting",
+        "process_text_with_nesting_bytes",
+        as_bytes=True,
+    )
+
+
+@benchmark("markdown_convert_file_text", [250_000, 500_000, 1 * MB])
+def bench_convert_file_text(size):
+    import markdown_to_tana_paste as module
+
+    data = _bullet_document(size).encode("ascii")
+    return lambda: module.convert_markdown(data.decode("ascii")).encode("ascii")
+
+
+@benchmark("markdown_convert_file_bytes", [250_000, 500_000, 1 * MB])
+def bench_convert_file_bytes(size):
+    import markdown_to_tana_paste as module
+
+    data = _bullet_document(size).encode("ascii")
+    return lambda: b"".join(module.convert_markdown_bytes(data))
+
+
+def _bench_chunked(transform, data):
+    # Chunked output from a bytes transform, without the writing.
+    import tana_chunks
+
+    return lambda: sum(1 for _ in tana_chunks.iter_chunks(tana_chunks.iter_output_lines(transform(data))))
+
+
+# About 1M output nodes at the largest size.
+@benchmark("markdown_convert_chunked_file_bytes", [8 * MB, 16 * MB, 32 * MB])
+def bench_convert_chunked_file_bytes(size):
+    import markdown_to_tana_paste as module
+
+    return _bench_chunked(module.convert_markdown_bytes, _bullet_document(size).encode("ascii"))
+
+
+@benchmark("add_numbers_chunked_file_bytes", [5 * MB, 10 * MB, 20 * MB])
+def bench_add_numbers_chunked_file_bytes(size):
+    module = load_script("Add Numbers to paragraphs.py")
+    return _bench_chunked(module.add_numbers_to_paragraphs_bytes, _file_document(size))
+
+
+def verify_bytes_paths(documents=300):
+    """
+    Differential check: every bytes transform must give the encoded result of
+    its str transform, from bytes and from a memory-mapped file, whenever the
+    byte_io safety check accepts the input.
+    """
+    import os
+    import random
+    import tempfile
+
+    import byte_io
+    import markdown_to_tana_paste as converter
+
+    transforms = [
+        (load_script(script), text_name, bytes_name)
+        for script, text_name, bytes_name, _ in [
+            ("MergeLines.py", "MergeLines", "merge_lines_bytes", None),
+            ("Add Numbers to paragraphs.py", "add_numbers_to_paragraphs", "add_numbers_to_paragraphs_bytes", None),
+            ("split after colon.py", "process_text_no_duplicates", "process_text_no_duplicates_bytes", None),
+            ("split after ?.py", "process_text_with_nesting", "process_text_with_nesting_bytes", None),
+        ]
+    ]
+    transforms.append((converter, "convert_markdown", "convert_markdown_bytes"))
+    # Characters where str and bytes semantics differ, and harmless non-ASCII.
+    extras = ["\u00e9", "\u2014", "\u00a0", "\u2028", "\x0c", "\x1e", "\x85", "\u3000", "\r", "\r\n", "\t", "?", ":"]
+
+    rng = random.Random(0)
+    mismatches = checked = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input")
+        for seed in range(documents):
+            text = _bullet_document(300, seed)
+            if seed % 3:
+                text += "\n" + _file_document(300, seed).decode("utf-8")
+            if seed % 2:
+                characters = list(text)
+                for _ in range(rng.randint(1, 5)):
+                    characters.insert(rng.randrange(len(characters) + 1), rng.choice(extras))
+                text = "".join(characters)
+            data = text.encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(data)
+            for module, text_name, bytes_name in transforms:
+                safe = byte_io.ascii_safe if module is converter else byte_io.bytes_safe
+                if not safe(data):
+                    continue
+                expected = getattr(module, text_name)(text).encode("utf-8")
+                with byte_io.open_input(path) as mapped:
+                    for source in (data, mapped):
+                        checked += 1
+                        if b"".join(getattr(module, bytes_name)(source)) != expected:
+                            mismatches += 1
+                            print(f"{bytes_name} differs for seed {seed}")
+    print(f"{checked} checks, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def verify_chunks(documents=300):
+    """
+    Checks tana_chunks on the output of every Tana Paste transform, as str
+    and as bytes: the chunks must hold exactly the output's lines, start on
+    a top-level node outside a code block, and stay within the limits unless
+    they hold a single subtree.
+    """
+    import random
+
+    import markdown_to_tana_paste as converter
+    import tana_chunks
+    from tana_paste_reader import CODE_END, CODE_LINE, iter_nodes
+
+    transforms = [
+        (getattr(load_script(script), text_name), getattr(load_script(script), bytes_name))
+        for script, text_name, bytes_name in [
+            ("Add Numbers to paragraphs.py", "add_numbers_to_paragraphs", "add_numbers_to_paragraphs_bytes"),
+            ("split after colon.py", "process_text_no_duplicates", "process_text_no_duplicates_bytes"),
+            ("split after ?.py", "process_text_with_nesting", "process_text_with_nesting_bytes"),
+        ]
+    ]
+    transforms.append((converter.convert_markdown, converter.convert_markdown_bytes))
+
+    rng = random.Random(0)
+    mismatches = checked = 0
+    for seed in range(documents):
+        text = _bullet_document(1_000, seed)
+        for text_transform, bytes_transform in transforms:
+            output = text_transform(text)
+            lines = [line for line in output.split("\n")[1:] if line]
+            events = list(iter_nodes(lines))
+            max_nodes, max_bytes = rng.choice([0, 1, 5, 40]), rng.choice([0, 1, 200, 2_000])
+            for source in (output, bytes_transform(text.encode("ascii"))):
+                checked += 1
+                chunks = list(tana_chunks.iter_chunks(tana_chunks.iter_output_lines(source), max_nodes, max_bytes))
+                problems = []
+                if [line for chunk in chunks for line in chunk[1:]] != [
+                    line.encode("ascii") if isinstance(chunks[0][0], bytes) else line for line in lines
+                ]:
+                    problems.append("lines differ")
+                start = 0
+                for chunk in chunks:
+                    depth, kind, _ = events[start]
+                    if depth != 1 or kind in (CODE_LINE, CODE_END):
+                        problems.append(f"chunk starts inside a subtree at node {start}")
+                    subtrees = sum(
+                        depth == 1 and kind not in (CODE_LINE, CODE_END)
+                        for depth, kind, _ in events[start : start + len(chunk) - 1]
+                    )
+                    size = len((b"\n" if isinstance(chunk[0], bytes) else "\n").join(chunk))
+                    if subtrees > 1 and (
+                        (max_nodes and len(chunk) - 1 > max_nodes) or (max_bytes and size > max_bytes)
+                    ):
+                        problems.append(f"chunk over the limits at node {start}")
+                    start += len(chunk) - 1
+                if problems:
+                    mismatches += 1
+                    print(f"{text_transform.__name__} chunks for seed {seed}: {', '.join(problems)}")
+    print(f"{checked} chunk checks, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def verify_fast_path(documents=500):
+    """
+    Differential check: the fast path must match the tree path exactly.
+    """
+    import io
+
+    import markdown_to_tana_paste as module
+
+    converter = module.MarkdownToTanaConverter()
+    mismatches = 0
+    for seed in range(documents):
+        text = _bullet_document(2_000, seed)
+        output = io.StringIO()
+        converter.render(module.TanaRenderer(output), markdown_text=text)
+        if converter.convert(text) != output.getvalue():
+            mismatches += 1
+            print(f"Fast path differs for seed {seed}")
+    print(f"{documents} documents, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def stress_converter(documents=2000, threads=8):
+    """
+    Converts documents on a thread pool and checks every result against a
+    serial run. On a free-threaded build the threaded time should scale
+    down with the number of cores.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import markdown_to_tana_paste as module
+
+    texts = [_markdown_document(1_000 + 3 * i) for i in range(documents)]
+
+    start = time.perf_counter()
+    expected = [module.MarkdownToTanaConverter(text).convert() for text in texts]
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(module.convert_markdown, texts))
+    threaded = time.perf_counter() - start
+
+    mismatches = sum(result != reference for result, reference in zip(results, expected))
+    print(f"{documents} documents: serial {serial:.2f}s, {threads} threads {threaded:.2f}s, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def measure(setup, size, repeat=3):
+    """
+    Returns the best of repeat timings, in seconds.
+    """
+    run = setup(size)
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(names=None, repeat=3):
+    """
+    Runs the named benchmarks (all by default) and prints a table.
+
+    Returns:
+        dict: name -> list of [size, seconds].
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, sizes = BENCHMARKS[name]
+        points = []
+        for size in sizes:
+            seconds = measure(setup, size, repeat)
+            points.append([size, seconds])
+            print(f"{name:40} {size:>12,} chars {seconds:10.4f}s {size / MB / max(seconds, 1e-9):10.1f} MB/s")
+        print(f"{name:40} scaling exponent {scaling_exponent(points):.2f}\n")
+        results[name] = points
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the transform benchmarks.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="timings per size; the best is kept")
+    parser.add_argument("--save", metavar="PATH", help="write the measurements as JSON")
+    parser.add_argument("--stress", action="store_true", help="run the concurrent converter check instead")
+    parser.add_argument("--verify", action="store_true", help="check the fast paths and the chunking")
+    args = parser.parse_args()
+    if args.stress:
+        raise SystemExit(0 if stress_converter() else 1)
+    if args.verify:
+        raise SystemExit(0 if verify_fast_path() & verify_bytes_paths() & verify_chunks() else 1)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmark: " + ", ".join(unknown))
+
+    results = run(args.names, args.repeat)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
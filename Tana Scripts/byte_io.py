@@ -0,0 +1,151 @@
+import contextlib
+import mmap
+import re
+import sys
+
+# File and stdin input for the line transforms, kept as bytes.
+#
+# Files are memory-mapped, so a multi-GB input is never decoded into a str
+# (up to 4 bytes per character) or copied as a whole. The bytes patterns and
+# bytes.strip() give the same result as the str versions as long as the input
+# has no byte that str treats as a line break or whitespace but bytes don't:
+# \v, \f, \x1c-\x1f, and the UTF-8 encodings of U+0085, U+00A0, U+1680,
+# U+2000-U+200A, U+2028, U+2029, U+202F, U+205F and U+3000. Inputs with any
+# of those are decoded and run through the str transform instead. Input that
+# isn't valid UTF-8 passes through the bytes transforms unchanged, where
+# decoding would have failed.
+
+# Written to start with a single character class, which the regex engine
+# scans for much faster than an alternation.
+UNSAFE_BYTES = re.compile(
+    rb"[\x0b\x0c\x1c-\x1f\xc2\xe1\xe2\xe3]"
+    rb"(?:(?<=[\x0b\x0c\x1c-\x1f])|(?<=\xc2)[\x85\xa0]|(?<=\xe1)\x9a\x80"
+    rb"|(?<=\xe2)(?:\x80[\x80-\x8a\xa8\xa9\xaf]|\x81\x9f)|(?<=\xe3)\x80\x80)"
+)
+# Bytes that can't start a match of UNSAFE_BYTES. Deleting them with
+# bytes.translate() is much faster than a regex search, and most blocks of
+# real input have nothing left to search.
+HARMLESS_BYTES = bytes(sorted(set(range(256)) - set(b"\x0b\x0c\x1c\x1d\x1e\x1f\xc2\xe1\xe2\xe3")))
+# Patterns with \d, \s or case rules match more than ASCII in a str, so the
+# converter only takes the bytes path for plain ASCII.
+ASCII_SAFE_BYTES = bytes(sorted(set(range(0x80)) - set(b"\x0b\x0c\x1c\x1d\x1e\x1f")))
+BLOCK_SIZE = 1 << 20  # Bytes split into lines at a time
+
+
+def bytes_safe(data):
+    """
+    Returns True if the bytes transforms give the same result as the str
+    transforms on this UTF-8 input.
+    """
+    for block in iter_blocks(data):
+        if block.translate(None, HARMLESS_BYTES) and UNSAFE_BYTES.search(block):
+            return False
+    return True
+
+
+def ascii_safe(data):
+    """
+    Returns True if the input is ASCII without \\v, \\f or \\x1c-\\x1f.
+    """
+    return not any(block.translate(None, ASCII_SAFE_BYTES) for block in iter_blocks(data))
+
+
+@contextlib.contextmanager
+def open_input(path):
+    """
+    Opens a file ("-" for stdin) as a bytes-like object: a read-only memory
+    map for regular files, bytes for stdin and empty files.
+    """
+    if path == "-":
+        yield sys.stdin.buffer.read()
+        return
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files can't be mapped
+            yield b""
+            return
+        with data:
+            yield data
+
+
+def iter_blocks(data):
+    """
+    Yields bytes or an mmap as bytes blocks of about BLOCK_SIZE that end
+    just after a "\n" (apart from the last), so no line, or "\r\n", is
+    split between blocks.
+    """
+    start, end = 0, len(data)
+    while start < end:
+        stop = data.rfind(b"\n", start, start + BLOCK_SIZE) + 1
+        if not stop:
+            # No line break in the block: take the line up to the next one.
+            stop = data.find(b"\n", start + BLOCK_SIZE) + 1 or end
+        yield data[start:stop]
+        start = stop
+
+
+def iter_lines(data):
+    """
+    Yields the lines of bytes or an mmap without their line breaks, like
+    bytes.splitlines() but a block at a time instead of building the whole
+    list.
+    """
+    for block in iter_blocks(data):
+        yield from block.splitlines()
+
+
+def iter_text_lines(data):
+    """
+    Yields the lines of UTF-8 bytes or an mmap as str, like
+    str(data, "utf-8").splitlines() but decoding a block at a time. Blocks
+    end after a "\n", which never falls inside a character or a "\r\n".
+    """
+    for block in iter_blocks(data):
+        yield from str(block, "utf-8").splitlines()
+
+
+def write_output(path, chunks):
+    """
+    Writes an iterable of bytes chunks to a file, or to stdout for None or "-".
+
+    Returns:
+        int: The number of bytes written.
+    """
+    if path is None or path == "-":
+        written = _write_batched(sys.stdout.buffer, chunks)
+        sys.stdout.buffer.flush()
+        return written
+    with open(path, "wb") as out:
+        return _write_batched(out, chunks)
+
+
+def _write_batched(out, chunks):
+    # Small chunks are joined into writes of about BLOCK_SIZE bytes.
+    batch = []
+    size = 0
+    written = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk)
+        if size >= BLOCK_SIZE:
+            out.write(b"".join(batch))
+            written += size
+            batch = []
+            size = 0
+    out.write(b"".join(batch))
+    return written + size
+
+
+def join_lines(lines, separator=b"\n"):
+    """
+    Yields the lines with the separator between them, as "\\n".join() would,
+    without holding the joined result.
+    """
+    lines = iter(lines)
+    for line in lines:
+        yield line
+        break
+    for line in lines:
+        yield separator
+        yield line
@@ -0,0 +1,249 @@
+#!/opt/homebrew/bin/python3
+
+# Watches the clipboard and applies the matching transform automatically,
+# instead of pressing a hotkey per script.
+#
+#   Markdown           -> MarkdownToTanaConverter
+#   dash/bullet list   -> split_on_separators
+#   filename + number  -> increment_last_number
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+
+import metrics
+from script_loader import MACOS_DIR, load_script
+
+MIN_INTERVAL = 0.25  # Seconds between polls right after a change
+MAX_INTERVAL = 2.0  # Seconds between polls once the clipboard is idle
+BACKOFF = 1.5  # Interval multiplier for every poll that sees no change
+
+MARKDOWN_LINE = re.compile(r"^(#{1,6}\s+\S|```|\s*(?:[-*+]|\d+\.)\s+\S|\*\*.+\*\*\s*$)", re.MULTILINE)
+FILENAME = re.compile(r'^[^\n\\/:*?"<>|]*\d[^\n\\/:*?"<>|]*\.[A-Za-z][A-Za-z0-9]{0,4}$')
+
+
+class MemoryClipboard:
+    """
+    In-memory stand-in for the clipboard, with the same paste()/copy()
+    interface as pyperclip.
+    """
+
+    def __init__(self, text=""):
+        self.text = text
+        self.reads = 0
+        self.writes = 0
+
+    def paste(self):
+        self.reads += 1
+        return self.text
+
+    def copy(self, text):
+        self.writes += 1
+        self.text = text
+
+
+class PasteboardClipboard:
+    """
+    macOS clipboard that reads raw bytes through pbpaste, so the watcher can
+    compare length and hash before decoding anything.
+    """
+
+    def paste(self):
+        return subprocess.run(["pbpaste"], capture_output=True, check=True).stdout
+
+    def copy(self, text):
+        subprocess.run(["pbcopy"], input=text.encode("utf-8"), check=True)
+
+
+class Rule:
+    def __init__(self, name, matches, transform):
+        self.name = name
+        self.matches = matches
+        self.transform = transform
+
+    def __repr__(self):
+        return f"Rule({self.name})"
+
+
+def looks_like_filename(text):
+    """
+    Detects a single filename with a number before its extension, e.g.
+    "scan_009.pdf". A number only in the extension ("song.mp3") doesn't count.
+    """
+    if len(text) > 255 or FILENAME.match(text) is None:
+        return False
+    return any(character.isdigit() for character in os.path.splitext(text)[0])
+
+
+def looks_like_markdown(text):
+    """
+    Detects multi-line Markdown: headings, fences, list items or bold headings
+    at the start of a line.
+    """
+    if "\n" not in text.strip() or text.startswith("%%tana%%"):
+        return False
+    return MARKDOWN_LINE.search(text) is not None
+
+
+def default_rules():
+    """
+    Builds the default rules from the existing hotkey scripts.
+    First matching rule wins.
+    """
+    converter = load_script("markdown_to_tana_paste.py")
+    splitter = load_script("Split_Paragraph_Generalv2.py")
+    renamer = load_script(os.path.join(MACOS_DIR, "Increase filename number by 1.py"))
+
+    def is_dash_list(text):
+        if "\n" in text.strip():
+            return False
+        text = splitter.normalise_spaces(text)
+        return splitter.contains_list_separator(text, splitter.LIST_SEPARATORS)
+
+    def split_list(text):
+        text = splitter.normalise_spaces(text)
+        return "\n".join(splitter.split_on_separators(text, splitter.LIST_SEPARATORS))
+
+    return [
+        Rule("filename", looks_like_filename, renamer.increment_last_number),
+        Rule("markdown", looks_like_markdown, converter.convert_markdown),
+        Rule("dash list", is_dash_list, split_list),
+    ]
+
+
+def _signature(data):
+    return len(data), hash(data)
+
+
+class ClipboardWatcher:
+    """
+    Polls a clipboard backend and applies the first matching rule to new
+    clipboard contents.
+
+    The poll interval starts at min_interval after a change and backs off to
+    max_interval while the clipboard stays the same. Changes are detected by
+    comparing length, then hash, of the raw clipboard data; it is only
+    decoded when it has changed. Text the watcher wrote itself is never
+    processed again, and neither is text a transform failed on.
+
+    watch() runs the polls on a worker thread, since both the backend and
+    the transforms block.
+    """
+
+    def __init__(self, backend, rules=None, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, backoff=BACKOFF):
+        self.backend = backend
+        self.rules = default_rules() if rules is None else rules
+        self._transforms = {}  # rule name -> instrumented transform
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._last_length = None
+        self._last_hash = None
+        self._written = None
+        self._stopped = False
+
+    def _changed(self, data):
+        # Length first: different lengths mean a change without hashing.
+        if len(data) == self._last_length and hash(data) == self._last_hash:
+            return False
+        self._last_length, self._last_hash = _signature(data)
+        return True
+
+    def poll_once(self):
+        """
+        Checks the clipboard once.
+
+        Returns:
+            str or None: The name of the rule applied, or None if nothing
+            changed or no rule matched.
+        """
+        data = self.backend.paste()
+        if not data or not self._changed(data):
+            return None
+        if _signature(data) == self._written:
+            return None
+
+        text = data.decode("utf-8", errors="replace") if isinstance(data, bytes) else data
+        for rule in self.rules:
+            transform = self._transforms.get(rule.name)
+            if transform is None:
+                transform = self._transforms[rule.name] = metrics.instrument(rule.name, rule.transform)
+            try:
+                if not rule.matches(text):
+                    continue
+                result = transform(text)
+            except Exception as e:
+                # _changed() has recorded this clipboard, so it isn't retried.
+                print(f"The {rule.name} transform failed, clipboard left unchanged: {e!r}", file=sys.stderr)
+                return None
+            if result == text:
+                return None
+            self.backend.copy(result)
+            # Remember our own output in the form the backend will return it.
+            written = result.encode("utf-8") if isinstance(data, bytes) else result
+            self._written = _signature(written)
+            self._last_length, self._last_hash = self._written
+            return rule.name
+        return None
+
+    async def watch(self, on_apply=None):
+        """
+        Polls until stop() is called.
+        """
+        self._stopped = False
+        # Take the current contents as the baseline so an old clipboard is left alone.
+        data = await asyncio.to_thread(self.backend.paste)
+        if data:
+            self._last_length, self._last_hash = _signature(data)
+
+        while not self._stopped:
+            await asyncio.sleep(self.interval)
+            changed = self._last_hash
+            applied = await asyncio.to_thread(self.poll_once)
+            if applied is not None and on_apply is not None:
+                on_apply(applied)
+            if self._last_hash != changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def stop(self):
+        self._stopped = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transform the clipboard automatically as it changes.")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL)
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    if sys.platform == "darwin":
+        backend = PasteboardClipboard()
+    else:
+        import pyperclip
+
+        backend = pyperclip
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    def on_apply(name):
+        print(f"Applied {name} transform.")
+        if args.metrics_file:
+            metrics.write_textfile(args.metrics_file)
+
+    watcher = ClipboardWatcher(backend, min_interval=args.min_interval, max_interval=args.max_interval)
+    print("Watching the clipboard. Press Ctrl+C to stop.")
+    try:
+        asyncio.run(watcher.watch(on_apply=on_apply))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
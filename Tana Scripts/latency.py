@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Latency budget for the hotkey transforms.
+#
+# Before a transform runs, its time is projected from the input size and the
+# benchmark suite's scaling data. Over budget, a script's cheaper fallback is
+# used if it has one. Either way the transform runs on a worker thread. If it
+# is still going when the budget runs out (projected or not), progress is
+# reported until it finishes. The scripts only touch the clipboard once it
+# has returned, and Ctrl+C cancels without touching it.
+
+DEFAULT_BUDGET = 3.0  # Seconds
+# Per-transform budgets, where the default doesn't suit.
+BUDGETS = {
+    "increment_filename": 1.0,
+}
+PROGRESS_INTERVAL = 2.0  # Seconds between progress reports
+DATA_PATH = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "Tana Scripts", "scaling.json")
+
+# Transform name -> the benchmark whose scaling data estimates it.
+BENCHMARK_FOR = {
+    "merge_lines": "merge_lines_file_text",
+    "add_numbers": "add_numbers_file_text",
+    "split_after_colon": "split_after_colon_file_text",
+    "split_after_question": "split_after_question_file_text",
+    "split_paragraph": "paragraph_split_serial",
+    "split_paragraph_general": "paragraph_split_serial",
+    "markdown_to_tana": "markdown_convert_colons",
+}
+
+# Measurements from benchmarks.py, [[size in characters, seconds], ...], used
+# when there is no scaling data file. Regenerate for your machine with
+#   python benchmarks.py --save "$HOME/Library/Application Support/Tana Scripts/scaling.json"
+DEFAULT_SCALING = {
+    "merge_lines_file_text": [[5_000_000, 0.053], [10_000_000, 0.154], [20_000_000, 0.304]],
+    "add_numbers_file_text": [[5_000_000, 0.127], [10_000_000, 0.263], [20_000_000, 0.328]],
+    "split_after_colon_file_text": [[5_000_000, 0.194], [10_000_000, 0.362], [20_000_000, 0.732]],
+    "split_after_question_file_text": [[5_000_000, 0.347], [10_000_000, 0.799], [20_000_000, 1.531]],
+    "paragraph_split_serial": [[5_000_000, 0.275], [10_000_000, 0.535], [20_000_000, 1.204]],
+    "markdown_convert_colons": [[250_000, 0.071], [500_000, 0.150], [1_000_000, 0.328]],
+}
+
+
+def load_scaling(path=DATA_PATH):
+    """
+    Returns the scaling data saved by benchmarks.py --save, falling back to
+    DEFAULT_SCALING for benchmarks the file doesn't have.
+    """
+    scaling = dict(DEFAULT_SCALING)
+    try:
+        with open(path) as f:
+            scaling.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    return scaling
+
+
+def scaling_exponent(points):
+    """
+    Least-squares slope of log(time) against log(size).
+    """
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(seconds, 1e-9)) for _, seconds in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return float("nan")
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def estimate_seconds(name, size, scaling=None):
+    """
+    Projects the time a transform takes on an input of size characters.
+
+    The benchmark's largest measurement is extrapolated with its fitted
+    scaling exponent, never taken as better than linear.
+
+    Returns:
+        float or None: The estimate, or None if there is no data for name.
+    """
+    points = (load_scaling() if scaling is None else scaling).get(BENCHMARK_FOR.get(name, name))
+    if not points:
+        return None
+    exponent = max(scaling_exponent(points), 1.0) if len(points) > 1 else 1.0
+    largest_size, largest_seconds = max(points)
+    return largest_seconds * (max(size, 1) / largest_size) ** exponent
+
+
+def budget_for(name, budget=None):
+    """
+    Returns the budget in seconds: the one given, else the transform's entry
+    in BUDGETS, else DEFAULT_BUDGET. 0 means no budget.
+    """
+    if budget is not None:
+        return budget
+    return BUDGETS.get(name, DEFAULT_BUDGET)
+
+
+def notify(message):
+    """
+    Prints a message and, on macOS, shows it as a notification, since the
+    hotkey scripts usually run without a visible terminal.
+    """
+    print(message, file=sys.stderr)
+    if sys.platform == "darwin":
+        script = f"display notification {json.dumps(message)} with title \"Tana Scripts\""
+        subprocess.run(["osascript", "-e", script], check=False)
+
+
+def _format_seconds(seconds):
+    return f"{seconds:.0f}s" if seconds >= 10 else f"{seconds:.1f}s"
+
+
+def run_with_budget(name, func, args, size, budget=None, fallback=None, scaling=None):
+    """
+    Calls func(*args) within the latency budget.
+
+    Parameters:
+        name (str): The transform name, as in BENCHMARK_FOR and BUDGETS.
+        func (callable): The transform.
+        args (tuple): Its arguments.
+        size (int): The input size in characters, for the estimate.
+        budget (float): Seconds; None for budget_for(name), 0 for no budget.
+        fallback (callable): A cheaper transform taking the same arguments,
+            used when func is projected to exceed the budget.
+        scaling (dict): Scaling data; None to load it.
+
+    Returns:
+        The transform's result.
+    """
+    budget = budget_for(name, budget)
+    if not budget:
+        return func(*args)
+
+    estimate = estimate_seconds(name, size, scaling)
+    announced = False
+    if estimate is not None and estimate > budget:
+        if fallback is not None:
+            notify(f"Large input: {name} would take about {_format_seconds(estimate)}, using the faster mode.")
+            func = fallback
+            estimate = None
+        else:
+            notify(f"Large input: {name} will take about {_format_seconds(estimate)}. Press Ctrl+C to cancel.")
+            announced = True
+
+    outcome = {}
+
+    def work():
+        try:
+            outcome["result"] = func(*args)
+        except BaseException as e:  # Re-raised on the calling thread
+            outcome["error"] = e
+
+    # A daemon thread, so a cancelled run doesn't keep the process alive.
+    worker = threading.Thread(target=work, name=f"{name} worker", daemon=True)
+    start = time.monotonic()
+    worker.start()
+    try:
+        worker.join(budget)
+        if worker.is_alive() and not announced:
+            notify(f"{name} is taking longer than {_format_seconds(budget)}. Press Ctrl+C to cancel.")
+        while worker.is_alive():
+            worker.join(PROGRESS_INTERVAL)
+            if worker.is_alive():
+                elapsed = time.monotonic() - start
+                if estimate is not None and estimate > elapsed:
+                    left = f", about {_format_seconds(estimate - elapsed)} left"
+                else:
+                    left = ""
+                print(f"{name}: {_format_seconds(elapsed)} elapsed{left}...", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Cancelled. The clipboard was left unchanged.", file=sys.stderr)
+        raise SystemExit(130)
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
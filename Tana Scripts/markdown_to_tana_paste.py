@@ -1,10 +1,164 @@
+import argparse
+import io
+import json
 import re
+from xml.sax.saxutils import escape, quoteattr
+
 import pyperclip
 
+from byte_io import ascii_safe, iter_lines, join_lines
+from metrics import CONVERTER_NODES
+from tana_chunks import add_chunk_arguments, check_chunk_arguments, copy_chunks
+from tana_sections import INDEX_SUFFIX, SectionIndex, line_size, write_index
+from transform_cli import add_arguments, add_file_arguments, run, run_file
+
 # import sys
 
+# Compiled once and shared: compiled patterns are safe to use from many threads.
+HEADING = re.compile(r"^(#{1,6})\s+(.+)$")
+BOLD_HEADING = re.compile(r"^\*\*(.+?)\*\*\s*$")
+NUMBERED_ITEM = re.compile(r"^(\s*)(\d+\.)\s+(.*)$")
+BULLET_ITEM = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+CODE_PLACEHOLDER = re.compile(r"CODE_BLOCK_PLACEHOLDER_(\d+)")
+
+# The same patterns for ASCII file input read as bytes (see byte_io).
+HEADING_BYTES = re.compile(HEADING.pattern.encode("ascii"))
+BOLD_HEADING_BYTES = re.compile(BOLD_HEADING.pattern.encode("ascii"))
+NUMBERED_ITEM_BYTES = re.compile(NUMBERED_ITEM.pattern.encode("ascii"))
+BULLET_ITEM_BYTES = re.compile(BULLET_ITEM.pattern.encode("ascii"))
+CODE_PLACEHOLDER_BYTES = re.compile(CODE_PLACEHOLDER.pattern.encode("ascii"))
+# needs_tree over the raw input in one scan. Code blocks aren't skipped, which
+# can only send a document down the tree path unnecessarily.
+TREE_MARKERS_BYTES = re.compile(rb":[ \t]*(?:[\r\n]|\Z)|\*\*")
+
+
+def _classify(line, heading, bold_heading, numbered_item, bullet_item, quote):
+    if not line.strip():
+        return None
+
+    line = line.rstrip()
+    line_indent = len(line) - len(line.lstrip())
+
+    # Remove blockquote markers if present
+    if line.lstrip().startswith(quote):
+        line = line.lstrip()[1:].lstrip()
+
+    heading_match = heading.match(line)
+    if heading_match:
+        return "heading", line_indent, heading_match.group(2).strip(), len(heading_match.group(1))
+
+    bold_heading_match = bold_heading.match(line)
+    if bold_heading_match:
+        return "bold", line_indent, bold_heading_match.group(1).strip(), 0
+
+    numbered_match = numbered_item.match(line)
+    if numbered_match:
+        return "numbered", len(numbered_match.group(1)), numbered_match.group(3).strip(), 0
+
+    bullet_match = bullet_item.match(line)
+    if bullet_match:
+        return "bullet", len(bullet_match.group(1)), bullet_match.group(2).strip(), 0
+
+    return "text", line_indent, line.strip(), 0
+
+
+def classify_line(line):
+    """
+    Tokenize one clean Markdown line (code blocks already extracted).
+
+    Returns:
+        tuple: (kind, indent, content, level), where kind is "heading",
+        "bold", "numbered", "bullet" or "text" and level is the heading
+        level, or None for a blank line.
+    """
+    return _classify(line, HEADING, BOLD_HEADING, NUMBERED_ITEM, BULLET_ITEM, ">")
+
+
+def classify_line_bytes(line):
+    """
+    classify_line for an ASCII bytes line; the content is returned as bytes.
+    """
+    return _classify(line, HEADING_BYTES, BOLD_HEADING_BYTES, NUMBERED_ITEM_BYTES, BULLET_ITEM_BYTES, b">")
+
+
+def needs_tree(clean_lines):
+    """
+    Cheap check for the full tree path: only lines ending with a colon
+    (re-parenting) or bold headings (which attach relative to the previous
+    heading) need it. "**" anywhere is enough to be safe.
+    """
+    return any(line.rstrip().endswith(":") or "**" in line for line in clean_lines)
+
+
+def _iter_clean_lines_bytes(lines, code_blocks):
+    # Streaming _extract_code_blocks for bytes lines: fenced blocks are
+    # appended to code_blocks and their placeholder is yielded in their place.
+    in_code_block = False
+    code_block_lang = b""
+    code_block_lines = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith(b"```"):
+            if in_code_block:
+                in_code_block = False
+                code_blocks.append((code_block_lang, b"\n".join(code_block_lines).rstrip()))
+                yield b"CODE_BLOCK_PLACEHOLDER_%d" % (len(code_blocks) - 1)
+                code_block_lines = []
+                code_block_lang = b""
+            else:
+                in_code_block = True
+                code_block_lang = stripped[3:].strip()
+        elif in_code_block:
+            code_block_lines.append(line)
+        else:
+            yield line
+
+
+def _iter_flat_depths(tokens):
+    """
+    Depth bookkeeping for the flat path: yields (depth, token) for every
+    non-blank token, from the heading levels and the list indentation seen
+    so far. Works the same for str and bytes tokens.
+    """
+    heading_depths = {}  # heading level -> depth of the open heading
+    current_depth = 0
+    list_stack = []  # (indent, depth) of open list items
+
+    for token in tokens:
+        if token is None:
+            continue
+        kind, indent, content, level = token
+
+        if kind == "heading":
+            depth = 1
+            for i in range(1, level):
+                if heading_depths.get(i) is not None:
+                    depth = heading_depths[i] + 1
+            heading_depths[level] = depth
+            for i in range(level + 1, 7):
+                heading_depths[i] = None
+            current_depth = depth
+            list_stack = []
+        else:
+            if kind == "text" and indent == 0:
+                list_stack = []
+            while list_stack and indent <= list_stack[-1][0]:
+                list_stack.pop()
+            depth = (list_stack[-1][1] if list_stack else current_depth) + 1
+            if kind != "text":
+                list_stack.append((indent, depth))
+        yield depth, token
+
 
 class MarkdownToTanaConverter:
+    """
+    Converts Markdown to Tana Paste.
+
+    The converter keeps no per-document state: every parse() or convert()
+    call works on its own scratch lists and tree, so one instance can be
+    reused, or shared between threads.
+    """
+
     class Node:
         def __init__(self, node_type, content, level=0):
             self.type = node_type  # 'heading', 'bullet', 'numbered', 'text', or 'code'
@@ -22,20 +176,21 @@ class MarkdownToTanaConverter:
         def __repr__(self):
             return f"{self.type}({self.level}): {self.content}"
 
-    def __init__(self, markdown_text):
+    def __init__(self, markdown_text=None):
+        # Default text for parse()/convert() called without an argument
         self.markdown_text = markdown_text
-        self.code_blocks = []
-        self.clean_lines = []
-        self.root = None
-        # Tracks the last heading node (hash or bold)
-        self.last_heading = None
 
-    def _extract_code_blocks(self):
+    def _extract_code_blocks(self, markdown_text):
         """
         Extract code blocks from the markdown text.
-        Fenced code blocks are replaced by placeholders in self.clean_lines.
+        Fenced code blocks are replaced by placeholders in the clean lines.
+
+        Returns:
+            tuple: (code_blocks, clean_lines)
         """
-        lines = self.markdown_text.splitlines()
+        code_blocks = []
+        clean_lines = []
+        lines = markdown_text.splitlines()
         in_code_block = False
         code_block_lang = ""
         code_block_content = ""
@@ -44,8 +199,8 @@ class MarkdownToTanaConverter:
                 if in_code_block:
                     # End of code block.
                     in_code_block = False
-                    self.code_blocks.append((code_block_lang, code_block_content.rstrip()))
-                    self.clean_lines.append(f"CODE_BLOCK_PLACEHOLDER_{len(self.code_blocks) - 1}")
+                    code_blocks.append((code_block_lang, code_block_content.rstrip()))
+                    clean_lines.append(f"CODE_BLOCK_PLACEHOLDER_{len(code_blocks) - 1}")
                     code_block_content = ""
                     code_block_lang = ""
                 else:
@@ -56,7 +211,8 @@ class MarkdownToTanaConverter:
                 if in_code_block:
                     code_block_content += line + "\n"
                 else:
-                    self.clean_lines.append(line)
+                    clean_lines.append(line)
+        return code_blocks, clean_lines
 
     def _find_parent_for_list_item(self, indent, list_stack, colon_parents):
         """
@@ -76,38 +232,33 @@ class MarkdownToTanaConverter:
 
         return None
 
-    def _build_tree(self):
+    def _build_tree(self, clean_lines):
         """
-        Build the document tree from the clean markdown lines.
+        Build the document tree from the clean markdown lines and return its root.
         """
-        self.root = self.Node("root", "root", level=0)
-        current_node = self.root
+        root = self.Node("root", "root", level=0)
+        current_node = root
         heading_nodes = {i: None for i in range(1, 7)}
-        self.last_heading = self.root
+        # Tracks the last heading node (hash or bold)
+        last_heading = root
 
         # Track a stack of colon nodes with their indentation levels
         colon_parents = []  # List of (indent, node) tuples
         # list_stack for normal nesting
         list_stack = []
+        # Every non-blank line becomes one node
+        nodes = 0
 
-        for line in self.clean_lines:
-            if not line.strip():
+        for line in clean_lines:
+            token = classify_line(line)
+            if token is None:
                 continue
-
-            line = line.rstrip()
-            line_indent = len(line) - len(line.lstrip())
-
-            # Remove blockquote markers if present
-            if line.lstrip().startswith(">"):
-                line = line.lstrip()[1:].lstrip()
+            kind, indent, content, level = token
+            nodes += 1
 
             # Check for markdown headings starting with "#"
-            heading_match = re.match(r"^(#{1,6})\s+(.+)$", line)
-            if heading_match:
-                level = len(heading_match.group(1))
-                content = heading_match.group(2).strip()
-
-                parent = self.root
+            if kind == "heading":
+                parent = root
                 for i in range(1, level):
                     if heading_nodes.get(i) is not None:
                         parent = heading_nodes[i]
@@ -118,7 +269,7 @@ class MarkdownToTanaConverter:
                     heading_nodes[i] = None
 
                 current_node = node
-                self.last_heading = node
+                last_heading = node
 
                 # Reset colon and list tracking
                 colon_parents = []
@@ -126,22 +277,20 @@ class MarkdownToTanaConverter:
 
                 # If this heading ends with a colon, track it
                 if content.endswith(":"):
-                    colon_parents.append((line_indent, node))
+                    colon_parents.append((indent, node))
                 continue
 
             # Process pure bold headings
-            bold_heading_match = re.match(r"^\*\*(.+?)\*\*\s*$", line)
-            if bold_heading_match:
-                content = bold_heading_match.group(1).strip()
-                if self.last_heading is not None and getattr(self.last_heading, "is_bold", False):
-                    parent = self.last_heading.parent or current_node
+            if kind == "bold":
+                if last_heading is not None and getattr(last_heading, "is_bold", False):
+                    parent = last_heading.parent or current_node
                 else:
                     parent = current_node
                 node = self.Node("heading", content, parent.level + 1)
                 node.is_bold = True
                 parent.add_child(node)
                 current_node = node
-                self.last_heading = node
+                last_heading = node
 
                 # Reset colon and list tracking
                 colon_parents = []
@@ -149,22 +298,11 @@ class MarkdownToTanaConverter:
 
                 # If this heading ends with a colon, track it
                 if content.endswith(":"):
-                    colon_parents.append((line_indent, node))
+                    colon_parents.append((indent, node))
                 continue
 
             # Process list items (numbered or bullet)
-            numbered_match = re.match(r"^(\s*)(\d+\.)\s+(.*)$", line)
-            bullet_match = re.match(r"^(\s*)[-*+]\s+(.*)$", line)
-            if numbered_match or bullet_match:
-                if numbered_match:
-                    indent = len(numbered_match.group(1))
-                    list_type = "numbered"
-                    content = numbered_match.group(3).strip()
-                else:
-                    indent = len(bullet_match.group(1))
-                    list_type = "bullet"
-                    content = bullet_match.group(2).strip()
-
+            if kind == "numbered" or kind == "bullet":
                 # Find parent based on indentation
                 parent = None
 
@@ -188,7 +326,7 @@ class MarkdownToTanaConverter:
                     parent = current_node
 
                 # Create the new node
-                node = self.Node(list_type, content, parent.level + 1)
+                node = self.Node(kind, content, parent.level + 1)
                 parent.add_child(node)
 
                 # Update list stack - remove any items at same or greater indentation
@@ -206,24 +344,70 @@ class MarkdownToTanaConverter:
 
             # Process plain text lines
             # Clear list stack if not indented
-            if line_indent == 0:
+            if indent == 0:
                 list_stack = []
 
             # Find parent for this text line
-            parent = self._find_parent_for_list_item(line_indent, list_stack, colon_parents)
+            parent = self._find_parent_for_list_item(indent, list_stack, colon_parents)
 
             # Default to current node
             if parent is None:
                 parent = current_node
 
-            node = self.Node("text", line.strip(), parent.level + 1)
+            node = self.Node("text", content, parent.level + 1)
             parent.add_child(node)
 
             # If this line ends with a colon, add it to colon parents
-            if line.strip().endswith(":"):
+            if content.endswith(":"):
                 # Remove any colon parents at same or greater indentation
-                colon_parents = [cp for cp in colon_parents if cp[0] < line_indent]
-                colon_parents.append((line_indent, node))
+                colon_parents = [cp for cp in colon_parents if cp[0] < indent]
+                colon_parents.append((indent, node))
+
+        CONVERTER_NODES.inc(nodes, path="tree")
+        return root
+
+    def _iter_flat_tana_lines(self, clean_lines, code_blocks, index=None):
+        """
+        Fast path for documents without colon-terminated lines or bold
+        headings. Nothing gets re-parented, so each line's depth follows from
+        the heading levels and the list indentation seen so far, and the Tana
+        Paste lines are produced straight from the tokens, in order, without
+        building a tree. Heading sections are recorded in index, if given.
+        """
+        yield "%%tana%%"
+        nodes = 0
+        for depth, (kind, indent, content, level) in _iter_flat_depths(map(classify_line, clean_lines)):
+            nodes += 1
+            if kind == "heading":
+                text = f"!! {content}" if level == 1 else f"**{content}**"
+            elif kind == "bold":
+                # Only reached from convert_flat(): bold lines send convert() down the tree path.
+                text = f"**{content}**"
+            else:
+                text = content
+
+            indent_str = " " * (2 * depth)
+            m = CODE_PLACEHOLDER.search(content) if "CODE_BLOCK_PLACEHOLDER_" in content else None
+            if m:
+                code_lang, code_content = code_blocks[int(m.group(1))]
+                lines = [f"{indent_str}- ```{code_lang}"]
+                lines.extend(f"{indent_str}- {cl}" for cl in code_content.splitlines())
+                lines.append(f"{indent_str}- ```")
+                if index is not None:
+                    for line in lines:
+                        index.line(depth, line_size(line))
+                yield from lines
+            else:
+                line = f"{indent_str}- {text}"
+                if index is not None:
+                    index.line(depth, line_size(line), content if kind in ("heading", "bold") else None)
+                yield line
+        if not nodes:
+            # An empty document has always ended with a line break after the header.
+            yield ""
+        if index is not None:
+            index.finish()
+        CONVERTER_NODES.inc(nodes, path="flat")
 
     def _process_tree_after_building(self, node):
         """
@@ -255,59 +439,20 @@ class MarkdownToTanaConverter:
                         else:
                             i += 1
 
-    def _replace_code_blocks(self, node):
+    def _replace_code_blocks(self, node, code_blocks):
         """
         Recursively replace any code block placeholders in the tree with proper code nodes.
         """
         if "CODE_BLOCK_PLACEHOLDER_" in node.content:
-            m = re.search(r"CODE_BLOCK_PLACEHOLDER_(\d+)", node.content)
+            m = CODE_PLACEHOLDER.search(node.content)
             if m:
                 idx = int(m.group(1))
                 node.type = "code"
                 node.content = ""
-                node.code_lang = self.code_blocks[idx][0]
-                node.code_content = self.code_blocks[idx][1]
-        for child in node.children:
-            self._replace_code_blocks(child)
-
-    def _build_tana_structure(self, node, indent=0, parent_colon=False):
-        """
-        Recursively build the Tana Paste nested bullet output from the document tree.
-        Tracks if parent ended with colon to apply extra indentation.
-        """
-        result = []
-
-        # Apply extra indentation if parent ended with colon
-        if parent_colon:
-            indent += 2
-
-        indent_str = " " * indent
-
-        if node.type == "code":
-            result.append(f"{indent_str}- ```{node.code_lang}")
-            for cl in node.code_content.splitlines():
-                result.append(f"{indent_str}- {cl}")
-            result.append(f"{indent_str}- ```")
-        elif node.type != "root":
-            if node.type == "heading":
-                # For top‐level (hash) headings we use "!!", otherwise we wrap the text in bold markers.
-                if node.level == 1:
-                    text = f"!! {node.content}"
-                else:
-                    text = f"**{node.content}**"
-            else:
-                text = node.content
-            result.append(f"{indent_str}- {text}")
-
-        # Check if this node ends with a colon
-        ends_with_colon = node.content.strip().endswith(":")
-
-        # Process children
+                node.code_lang = code_blocks[idx][0]
+                node.code_content = code_blocks[idx][1]
         for child in node.children:
-            # Pass the colon flag to children so they know to indent more
-            result.extend(self._build_tana_structure(child, indent + 2, ends_with_colon))
-
-        return result
+            self._replace_code_blocks(child, code_blocks)
 
     def _post_process_tree(self, node):
         """
@@ -338,20 +483,376 @@ class MarkdownToTanaConverter:
                         break
             i += 1
 
-    # Add a call to this in the convert method:
-    def convert(self):
-        self._extract_code_blocks()
-        self._build_tree()
-        self._post_process_tree(self.root)
-        self._replace_code_blocks(self.root)
-        tana_structure = self._build_tana_structure(self.root)
-        tana_output = "%%tana%%\n" + "\n".join(tana_structure)
-        return tana_output
-
-
-markdown_text = pyperclip.paste()
-converter = MarkdownToTanaConverter(markdown_text)
-result = converter.convert()
-print(result)
-pyperclip.copy(result)
-# pyperclip.paste(result)
+    def _parse_lines(self, code_blocks, clean_lines):
+        root = self._build_tree(clean_lines)
+        self._post_process_tree(root)
+        self._replace_code_blocks(root, code_blocks)
+        return root
+
+    def parse(self, markdown_text=None):
+        """
+        Parse the markdown text into a new document tree and return its root.
+        """
+        if markdown_text is None:
+            markdown_text = self.markdown_text
+        return self._parse_lines(*self._extract_code_blocks(markdown_text))
+
+    def render(self, *renderers, markdown_text=None):
+        """
+        Parse once and feed the document tree to every renderer in a single traversal.
+        """
+        render_tree(self.parse(markdown_text), renderers)
+
+    def iter_tana_lines(self, markdown_text=None, index=None):
+        """
+        Yield the Tana Paste output line by line, starting with %%tana%%.
+        Documents that don't need the tree are streamed straight from the tokens.
+        Heading sections are recorded in index (a tana_sections.SectionIndex), if given.
+        """
+        if markdown_text is None:
+            markdown_text = self.markdown_text
+        code_blocks, clean_lines = self._extract_code_blocks(markdown_text)
+        if not needs_tree(clean_lines):
+            yield from self._iter_flat_tana_lines(clean_lines, code_blocks, index)
+            return
+        output = io.StringIO()
+        render_tree(self._parse_lines(code_blocks, clean_lines), [TanaRenderer(output, index)])
+        yield from output.getvalue().split("\n")
+
+    def iter_tana_lines_bytes(self, data, index=None):
+        """
+        iter_tana_lines for ASCII input read as bytes (see byte_io.ascii_safe),
+        yielding bytes lines. Documents for the flat path are converted line
+        by line without decoding or holding the input; documents that need
+        the tree are decoded and converted as text.
+        """
+        if TREE_MARKERS_BYTES.search(data):
+            for line in self.iter_tana_lines(str(data, "ascii"), index):
+                yield line.encode("ascii")
+            return
+
+        yield b"%%tana%%"
+        code_blocks = []
+        tokens = map(classify_line_bytes, _iter_clean_lines_bytes(iter_lines(data), code_blocks))
+        nodes = 0
+        for depth, (kind, indent, content, level) in _iter_flat_depths(tokens):
+            nodes += 1
+            if kind == "heading":
+                text = b"!! " + content if level == 1 else b"**" + content + b"**"
+            else:
+                text = content
+
+            indent_str = b" " * (2 * depth)
+            m = CODE_PLACEHOLDER_BYTES.search(content) if b"CODE_BLOCK_PLACEHOLDER_" in content else None
+            if m:
+                code_lang, code_content = code_blocks[int(m.group(1))]
+                lines = [indent_str + b"- ```" + code_lang]
+                lines.extend(indent_str + b"- " + cl for cl in code_content.splitlines())
+                lines.append(indent_str + b"- ```")
+                if index is not None:
+                    for line in lines:
+                        index.line(depth, len(line))
+                yield from lines
+            else:
+                line = indent_str + b"- " + text
+                if index is not None:
+                    index.line(depth, len(line), content.decode("ascii") if kind == "heading" else None)
+                yield line
+        if not nodes:
+            yield b""
+        if index is not None:
+            index.finish()
+        CONVERTER_NODES.inc(nodes, path="flat")
+
+    def convert_flat(self, markdown_text=None):
+        """
+        Cheaper conversion for documents too large for the tree: every line
+        is placed by the heading levels and list indentation alone, as on the
+        fast path, so lines under a colon-terminated line aren't re-parented
+        and bold headings nest like list items. Same as convert() for
+        documents that don't need the tree.
+        """
+        if markdown_text is None:
+            markdown_text = self.markdown_text
+        code_blocks, clean_lines = self._extract_code_blocks(markdown_text)
+        return "\n".join(self._iter_flat_tana_lines(clean_lines, code_blocks))
+
+    def convert(self, markdown_text=None, index=None):
+        if markdown_text is None:
+            markdown_text = self.markdown_text
+        code_blocks, clean_lines = self._extract_code_blocks(markdown_text)
+        if not needs_tree(clean_lines):
+            return "\n".join(self._iter_flat_tana_lines(clean_lines, code_blocks, index))
+        output = io.StringIO()
+        render_tree(self._parse_lines(code_blocks, clean_lines), [TanaRenderer(output, index)])
+        return output.getvalue()
+
+
+_shared_converter = MarkdownToTanaConverter()
+
+
+def convert_markdown(markdown_text):
+    """
+    Convert Markdown to Tana Paste. Reentrant and safe to call from many threads.
+    """
+    return _shared_converter.convert(markdown_text)
+
+
+def convert_markdown_bytes(data, index=None):
+    """
+    Convert ASCII Markdown read as bytes to Tana Paste, yielded in chunks.
+    """
+    return join_lines(_shared_converter.iter_tana_lines_bytes(data, index))
+
+
+class Renderer:
+    """
+    Base class for output backends. render_tree() calls enter() for every
+    node in document order, starting with the root, and leave() once the
+    node's children are done. Each renderer writes to its own stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def start(self):
+        pass
+
+    def enter(self, node):
+        pass
+
+    def leave(self, node):
+        pass
+
+    def finish(self):
+        pass
+
+
+class TanaRenderer(Renderer):
+    """
+    Tana Paste nested bullets. Children of a node ending with a colon get
+    extra indentation. Heading sections are recorded in index (a
+    tana_sections.SectionIndex), if given.
+    """
+
+    def __init__(self, stream, index=None):
+        super().__init__(stream)
+        self.index = index
+
+    def start(self):
+        self.stream.write("%%tana%%")
+        # (indent, ends with colon) for each open node
+        self.stack = []
+        self.empty = True
+
+    def _line(self, text, heading=None):
+        self.empty = False
+        self.stream.write("\n" + text)
+        if self.index is not None:
+            self.index.line(len(self.stack), line_size(text), heading)
+
+    def enter(self, node):
+        if node.type == "root":
+            indent = 0
+        else:
+            parent_indent, parent_colon = self.stack[-1]
+            # Apply extra indentation if parent ended with colon
+            indent = parent_indent + (4 if parent_colon else 2)
+            indent_str = " " * indent
+            if node.type == "code":
+                self._line(f"{indent_str}- ```{node.code_lang}")
+                for cl in node.code_content.splitlines():
+                    self._line(f"{indent_str}- {cl}")
+                self._line(f"{indent_str}- ```")
+            elif node.type == "heading":
+                # For top‐level (hash) headings we use "!!", otherwise we wrap the text in bold markers.
+                if node.level == 1:
+                    self._line(f"{indent_str}- !! {node.content}", node.content)
+                else:
+                    self._line(f"{indent_str}- **{node.content}**", node.content)
+            else:
+                self._line(f"{indent_str}- {node.content}")
+        self.stack.append((indent, node.content.strip().endswith(":")))
+
+    def leave(self, node):
+        self.stack.pop()
+
+    def finish(self):
+        if self.empty:
+            # An empty document has always ended with a line break after the header.
+            self.stream.write("\n")
+        if self.index is not None:
+            self.index.finish()
+
+
+class OPMLRenderer(Renderer):
+    """
+    OPML outline. Code blocks become a single outline with the code in _note.
+    """
+
+    def __init__(self, stream, title="Converted from Markdown"):
+        super().__init__(stream)
+        self.title = title
+
+    def start(self):
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">\n')
+        self.stream.write(f"  <head>\n    <title>{escape(self.title)}</title>\n  </head>\n  <body>\n")
+        self.depth = 1
+
+    def enter(self, node):
+        if node.type == "root":
+            return
+        self.depth += 1
+        if node.type == "code":
+            attributes = f"text={quoteattr('```' + node.code_lang)} _note={quoteattr(node.code_content)}"
+        else:
+            attributes = f"text={quoteattr(node.content)}"
+        close = ">" if node.children else " />"
+        self.stream.write(f"{'  ' * self.depth}<outline {attributes}{close}\n")
+
+    def leave(self, node):
+        if node.type == "root":
+            return
+        if node.children:
+            self.stream.write(f"{'  ' * self.depth}</outline>\n")
+        self.depth -= 1
+
+    def finish(self):
+        self.stream.write("  </body>\n</opml>\n")
+
+
+class JSONRenderer(Renderer):
+    """
+    The document tree as nested JSON objects, written as the tree is walked.
+    """
+
+    def start(self):
+        # Whether the open node has written a child yet
+        self.has_children = [False]
+
+    def enter(self, node):
+        if self.has_children[-1]:
+            self.stream.write(", ")
+        self.has_children[-1] = True
+        fields = {"type": node.type, "content": node.content, "level": node.level}
+        if node.type == "code":
+            fields["language"] = node.code_lang
+            fields["code"] = node.code_content
+        self.stream.write(json.dumps(fields)[:-1] + ', "children": [')
+        self.has_children.append(False)
+
+    def leave(self, node):
+        self.has_children.pop()
+        self.stream.write("]}")
+
+    def finish(self):
+        self.stream.write("\n")
+
+
+class PlainTextRenderer(Renderer):
+    """
+    Indented plain text, two spaces per level, without any markup.
+    """
+
+    def start(self):
+        self.depth = -1
+
+    def enter(self, node):
+        self.depth += 1
+        if node.type == "root":
+            return
+        indent_str = "  " * (self.depth - 1)
+        if node.type == "code":
+            for cl in node.code_content.splitlines():
+                self.stream.write(f"{indent_str}{cl}\n")
+        else:
+            self.stream.write(f"{indent_str}{node.content}\n")
+
+    def leave(self, node):
+        self.depth -= 1
+
+
+def render_tree(root, renderers):
+    """
+    Walk the document tree once, passing every node to each renderer.
+    """
+    for renderer in renderers:
+        renderer.start()
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            for renderer in renderers:
+                renderer.leave(node)
+            continue
+        for renderer in renderers:
+            renderer.enter(node)
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.children))
+    for renderer in renderers:
+        renderer.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Markdown on the clipboard to Tana Paste.")
+    parser.add_argument("--opml", metavar="PATH", help="also write an OPML version")
+    parser.add_argument("--json", metavar="PATH", help="also write a JSON version")
+    parser.add_argument("--text", metavar="PATH", help="also write an indented plain-text version")
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=f"with --input and --output, also write OUTPUT{INDEX_SUFFIX} for tana_sections.py",
+    )
+    add_arguments(parser)
+    add_file_arguments(parser)
+    add_chunk_arguments(parser)
+    args = parser.parse_args()
+    check_chunk_arguments(parser, args)
+    if args.index and (not args.input or args.output in (None, "-")):
+        parser.error("--index needs --input and an --output file")
+    if args.index and args.chunks:
+        parser.error("--index gives offsets into a single output file, so it can't be used with --chunks")
+
+    output = io.StringIO()
+    index = SectionIndex() if args.index else None
+    renderers = [TanaRenderer(output, index)]
+    files = []
+    for path, renderer_class in ((args.opml, OPMLRenderer), (args.json, JSONRenderer), (args.text, PlainTextRenderer)):
+        if path:
+            files.append(open(path, "w", encoding="utf-8"))
+            renderers.append(renderer_class(files[-1]))
+
+    def render_all(text):
+        if not files:
+            # Plain Tana Paste only needs the tree for documents the fast path can't take.
+            return _shared_converter.convert(text, index)
+        # One parse and one traversal feed every output.
+        MarkdownToTanaConverter(text).render(*renderers)
+        return output.getvalue()
+
+    try:
+        if args.input:
+            # The other outputs need the tree, so only plain Tana Paste streams as bytes.
+            bytes_transform = None if files else lambda data: convert_markdown_bytes(data, index)
+            run_file(args, "markdown_to_tana", bytes_transform, render_all, safe=ascii_safe)
+            if index is not None:
+                write_index(args.output + INDEX_SUFFIX, index)
+            return
+        # Past the latency budget, plain Tana Paste can skip the tree.
+        fallback = None if files else _shared_converter.convert_flat
+        result = run(args, "markdown_to_tana", render_all, pyperclip.paste(), fallback=fallback)
+    finally:
+        for f in files:
+            f.close()
+
+    if args.chunks:
+        copy_chunks(result, args.max_nodes, args.max_bytes)
+        return
+
+    print(result)
+    pyperclip.copy(result)
+    # pyperclip.paste(result)
+
+
+if __name__ == "__main__":
+    main()
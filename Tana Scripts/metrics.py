@@ -0,0 +1,403 @@
+#!/opt/homebrew/bin/python3
+
+# Counters and latency histograms for the transforms, for batch jobs and the
+# long-running services (clipboard_watcher.py, tana_watch_build.py).
+#
+#   python metrics.py --check   scrape a local endpoint and check the numbers
+#
+# Every thread records into its own shard, so recording takes no lock: one
+# thread-local lookup and a dict update. Shards are only summed when the
+# metrics are exported, as Prometheus text (textfile collector) or, to
+# scrapers that ask for it, OpenMetrics over HTTP.
+
+import argparse
+import bisect
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds; the last bucket catches everything.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+DEFAULT_PORT = 9464
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class Registry:
+    """
+    Holds the metric definitions and one shard of values per thread.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # name -> Counter or Histogram, in definition order
+        self._shards = []  # (counters, histograms) for every thread that recorded
+        self._lock = threading.Lock()  # Only taken when a thread records for the first time
+        self._local = threading.local()
+
+    def _new_shard(self):
+        # Called once per thread, the first time it records.
+        shard = ({}, {})
+        with self._lock:
+            self._shards.append(shard)
+        self._local.counters, self._local.histograms = shard
+
+    def counter(self, name, help):
+        return self.metrics.setdefault(name, Counter(self, name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, help, buckets))
+
+    def collect(self):
+        """
+        Sums the shards.
+
+        Returns:
+            tuple: ({(name, labels): total}, {(name, labels): [bucket counts..., sum, count]}).
+            Values recorded while collecting may be missed until the next call.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        counters = {}
+        histograms = {}
+        for shard_counters, shard_histograms in shards:
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, values in list(shard_histograms.items()):
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return counters, histograms
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry, name, help):
+        self.registry = registry
+        self.name = name
+        self.help = help
+
+    def labels(self, **labels):
+        """
+        Returns the counter with these label values bound, for hot paths.
+        """
+        return BoundCounter(self.registry, (self.name, tuple(labels.items())))
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+
+class BoundCounter:
+    __slots__ = ("registry", "key")
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def inc(self, amount=1):
+        local = self.registry._local
+        try:
+            counters = local.counters
+        except AttributeError:
+            self.registry._new_shard()
+            counters = local.counters
+        counters[self.key] = counters.get(self.key, 0) + amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+
+    def labels(self, **labels):
+        """
+        Returns the histogram with these label values bound, for hot paths.
+        """
+        return BoundHistogram(self.registry, (self.name, tuple(labels.items())), self.buckets)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+
+class BoundHistogram:
+    __slots__ = ("registry", "key", "buckets")
+
+    def __init__(self, registry, key, buckets):
+        self.registry = registry
+        self.key = key
+        self.buckets = buckets
+
+    def observe(self, value):
+        local = self.registry._local
+        try:
+            histograms = local.histograms
+        except AttributeError:
+            self.registry._new_shard()
+            histograms = local.histograms
+        values = histograms.get(self.key)
+        if values is None:
+            # One count per bucket (not cumulative), then the sum and the count.
+            values = histograms[self.key] = [0] * (len(self.buckets) + 2)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+
+REGISTRY = Registry()
+
+INVOCATIONS = REGISTRY.counter("tana_transform_invocations", "Transform calls.")
+ERRORS = REGISTRY.counter("tana_transform_errors", "Transform calls that raised an exception.")
+INPUT_BYTES = REGISTRY.counter("tana_transform_input_bytes", "UTF-8 bytes passed to transforms.")
+OUTPUT_BYTES = REGISTRY.counter("tana_transform_output_bytes", "UTF-8 bytes returned or written by transforms.")
+DURATION = REGISTRY.histogram("tana_transform_duration_seconds", "Time spent in transforms.")
+CONVERTER_NODES = REGISTRY.counter("tana_converter_nodes", "Nodes produced by the Markdown converter, by path.")
+BUILD_CACHE_HITS = REGISTRY.counter(
+    "tana_build_cache_hits", "Notes tana_watch_build didn't reconvert, by the check that matched (stat or hash)."
+)
+BUILD_CONVERSIONS = REGISTRY.counter("tana_build_conversions", "Notes tana_watch_build converted.")
+
+
+def text_size(value):
+    """
+    Returns the UTF-8 size of a transform's input or result: str, bytes-like,
+    a tuple containing those (e.g. (is_list, text)), or None.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        # isascii() is constant time, so ASCII text isn't encoded just to be measured.
+        return len(value) if value.isascii() else len(value.encode("utf-8"))
+    if isinstance(value, tuple):
+        return sum(text_size(item) for item in value if not isinstance(item, (bool, int)))
+    return len(value)
+
+
+def instrument(name, func):
+    """
+    Wraps a transform so each call records its invocation, input and output
+    sizes, duration and errors. The first argument is taken as the input.
+    """
+    invocations = INVOCATIONS.labels(transform=name)
+    errors = ERRORS.labels(transform=name)
+    input_bytes = INPUT_BYTES.labels(transform=name)
+    output_bytes = OUTPUT_BYTES.labels(transform=name)
+    duration = DURATION.labels(transform=name)
+
+    def instrumented(*args, **kwargs):
+        invocations.inc()
+        if args:
+            input_bytes.inc(text_size(args[0]))
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - start)
+        output_bytes.inc(text_size(result))
+        return result
+
+    return instrumented
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(registry=REGISTRY, openmetrics=False):
+    """
+    Formats the current values as Prometheus text, or as OpenMetrics, which
+    names counter families without "_total" and ends with "# EOF".
+    """
+    counters, histograms = registry.collect()
+    lines = []
+    for metric in registry.metrics.values():
+        if metric.kind == "counter":
+            family = metric.name if openmetrics else metric.name + "_total"
+            lines.append(f"# HELP {family} {metric.help}")
+            lines.append(f"# TYPE {family} counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric.name:
+                    lines.append(f"{metric.name}_total{_labels(labels)} {_number(value)}")
+        else:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} histogram")
+            for (name, labels), values in sorted(histograms.items()):
+                if name != metric.name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(values[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, registry=REGISTRY):
+    """
+    Writes the metrics for node_exporter's textfile collector. The file is
+    replaced atomically, so the collector never reads a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".metrics-", delete=False) as f:
+        f.write(render(registry))
+    os.replace(f.name, path)
+
+
+def serve(port=DEFAULT_PORT, host="127.0.0.1", registry=REGISTRY):
+    """
+    Serves /metrics from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: Call shutdown() to stop it. With port 0 the
+        chosen port is server.server_port.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            body = render(registry, openmetrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics server", daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-port", type=int, metavar="PORT", help="serve /metrics on localhost:PORT")
+    group.add_argument("--metrics-file", metavar="PATH", help="write Prometheus text metrics here")
+    return parser
+
+
+def parse(text):
+    """
+    Reads exported metrics back into {sample name with labels: value}.
+    """
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def check(threads=4, calls=250):
+    """
+    Records conversions from several threads, scrapes a local endpoint in
+    both formats and checks the totals. Also times the recording cost.
+    """
+    import urllib.request
+
+    from markdown_to_tana_paste import convert_markdown
+
+    convert = instrument("check_markdown", convert_markdown)
+    document = "# Title\n- one\n  - two\n- three:\n  - four\n"
+
+    def worker():
+        for _ in range(calls):
+            convert(document)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    try:
+        convert(None)
+    except AttributeError:
+        pass
+
+    server = serve(0)
+    url = f"http://127.0.0.1:{server.server_port}/metrics"
+    try:
+        plain = urllib.request.urlopen(url).read().decode("utf-8")
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+        open_text = urllib.request.urlopen(request).read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    total = threads * calls
+    label = '{transform="check_markdown"}'
+    samples = parse(plain)
+    expected = {
+        f"tana_transform_invocations_total{label}": total + 1,
+        f"tana_transform_errors_total{label}": 1,
+        f"tana_transform_input_bytes_total{label}": total * len(document),
+        f"tana_transform_duration_seconds_count{label}": total + 1,
+        'tana_converter_nodes_total{path="tree"}': total * 5,
+    }
+    failures = [f"{name}: {samples.get(name)} != {value}" for name, value in expected.items() if samples.get(name) != value]
+    if not open_text.endswith("# EOF\n") or parse(open_text) != samples:
+        failures.append("OpenMetrics output differs from the Prometheus text")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tana.prom")
+        write_textfile(path)
+        with open(path) as f:
+            if parse(f.read()) != samples:
+                failures.append("textfile differs from the scrape")
+
+    counter = REGISTRY.counter("tana_check_recording", "Recording cost check.").labels(transform="check")
+    start = time.perf_counter()
+    for _ in range(100_000):
+        counter.inc()
+    print(f"Bound counter inc(): {(time.perf_counter() - start) * 1e4:.0f} ns per call")
+
+    for failure in failures:
+        print(failure)
+    print("Metrics check " + ("failed." if failures else "passed."))
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the transform metrics and their export.")
+    parser.add_argument("--check", action="store_true", help="record, scrape a local endpoint and check the totals")
+    args = parser.parse_args()
+    if args.check:
+        # Through the imported module, whose registry the converter records into.
+        import metrics
+
+        raise SystemExit(0 if metrics.check() else 1)
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
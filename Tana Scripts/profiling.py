@@ -0,0 +1,156 @@
+import cProfile
+import collections
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), "Library", "Logs", "Tana Scripts")
+
+
+def _report_base(directory, name, suffixes):
+    # Report paths without their suffix. The process ID keeps runs started in
+    # the same second apart, and a number is added for repeats within a run.
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    candidate, number = base, 1
+    while any(os.path.exists(candidate + suffix) for suffix in suffixes):
+        number += 1
+        candidate = f"{base}-{number}"
+    return candidate
+
+
+def _per_input_mb(peak, input_bytes):
+    if not input_bytes:
+        return ""
+    return f" ({peak / MB / (input_bytes / MB):.1f} MB per input MB)"
+
+
+def profile_call(name, func, args, input_bytes, directory=DEFAULT_DIR, top=20):
+    """
+    Runs func(*args) under cProfile and tracemalloc.
+
+    Writes <name>-<time>-<pid>.pstats for pstats/snakeviz and
+    <name>-<time>-<pid>.alloc.txt with the top allocation sites, then prints the hottest functions and the
+    peak traced memory.
+
+    Returns:
+        The result of func(*args).
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        result = func(*args)
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    base = _report_base(directory, name, (".pstats", ".alloc.txt"))
+    stats_path = base + ".pstats"
+    profiler.dump_stats(stats_path)
+    alloc_path = base + ".alloc.txt"
+    with open(alloc_path, "w") as f:
+        f.write(f"Peak traced memory: {peak / MB:.1f} MB{_per_input_mb(peak, input_bytes)}\n")
+        f.write(f"Top {top} allocation sites still held at the end:\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            f.write(f"{stat}\n")
+
+    pstats.Stats(stats_path, stream=sys.stderr).sort_stats("cumulative").print_stats(top)
+    print(f"Peak memory: {peak / MB:.1f} MB{_per_input_mb(peak, input_bytes)}", file=sys.stderr)
+    print(f"Profile written to {stats_path} and {alloc_path}", file=sys.stderr)
+    return result
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler: a background thread records the stack of
+    one thread every interval seconds. Nothing is traced between samples, so
+    it is cheap enough for long batch runs.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        """
+        Writes the samples in collapsed-stack format (flamegraph.pl, speedscope).
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, top=20):
+        """
+        Returns [(function, samples)] for the functions seen on top of the stack most often.
+        """
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(top)
+
+
+def _peak_rss():
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def sample_call(name, func, args, input_bytes, directory=DEFAULT_DIR, top=20, interval=0.005):
+    """
+    Runs func(*args) under StackSampler and writes <name>-<time>-<pid>.samples.txt.
+
+    The process's peak RSS is reported with how far the call raised it above
+    the peak before the call, which leaves out the interpreter and the input.
+
+    Returns:
+        The result of func(*args).
+    """
+    before = _peak_rss()
+    with StackSampler(interval=interval) as sampler:
+        result = func(*args)
+
+    path = _report_base(directory, name, (".samples.txt",)) + ".samples.txt"
+    sampler.write_collapsed(path)
+    total = sum(sampler.stacks.values())
+    print(f"{total} samples every {interval * 1000:g} ms. Top functions:", file=sys.stderr)
+    for function, count in sampler.top_functions(top):
+        print(f"  {count / total:6.1%}  {function}", file=sys.stderr)
+    peak = _peak_rss()
+    growth = peak - before
+    print(
+        f"Peak RSS: {peak / MB:.1f} MB for the process, "
+        f"{growth / MB:.1f} MB above the peak before the call{_per_input_mb(growth, input_bytes)}",
+        file=sys.stderr,
+    )
+    print(f"Samples written to {path}", file=sys.stderr)
+    return result
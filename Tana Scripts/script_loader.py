@@ -0,0 +1,40 @@
+import importlib.util
+import os
+import re
+import sys
+
+# Most of the hotkey scripts have spaces in their filenames, so they can't be
+# imported with a plain import statement. load_script() imports them by path.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+MACOS_DIR = os.path.join(REPO_DIR, "macOS")
+
+
+def load_script(path):
+    """
+    Imports a script by filename and returns it as a module.
+
+    Parameters:
+        path (str): The script path. Relative paths are resolved against
+            the Tana Scripts folder.
+
+    Returns:
+        module: The loaded script. Repeated calls return the same module.
+    """
+    if not os.path.isabs(path):
+        path = os.path.join(SCRIPTS_DIR, path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = "script_" + re.sub(r"\W", "_", stem)
+
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return module
@@ -169,72 +169,153 @@
 
 # if __name__ == "__main__":
 #     main()
+import functools
 import pyperclip
 import re
 
+from byte_io import iter_lines, join_lines
+from tana_chunks import add_chunk_arguments, check_chunk_arguments, copy_chunks
+from transform_cli import add_file_arguments, make_parser, run, run_file
 
-def split_paragraphs(line):
+# Characters (or strings) that end a part. Other scripts can pass their own
+# set, e.g. ("?", "!", ":", ";", "…").
+TERMINATORS = ("?",)
+
+
+@functools.lru_cache(maxsize=None)
+def _terminator_pattern(terminators):
+    # A run of terminators ends one part, so "Really?!" stays together.
+    # Longest first, so "..." wins over ".".
+    alternatives = sorted(terminators, key=len, reverse=True)
+    return re.compile("(?:" + "|".join(map(re.escape, alternatives)) + ")+")
+
+
+@functools.lru_cache(maxsize=None)
+def _terminator_pattern_bytes(terminators):
+    # UTF-8 is self-synchronising, so the encoded pattern only matches whole characters.
+    return re.compile(_terminator_pattern(terminators).pattern.encode("utf-8"))
+
+
+def iter_parts(line, terminators=TERMINATORS):
+    """
+    Splits a line after each terminator in one linear scan.
+
+    Parameters:
+        line (str or bytes): The input line to process. Bytes lines are
+            matched as UTF-8 and yield bytes parts.
+        terminators (tuple): The strings that end a part.
+
+    Yields:
+        str or bytes: Each stripped, non-empty part, including its
+        terminator. Any text after the last terminator is yielded last.
+    """
+    if isinstance(line, bytes):
+        pattern = _terminator_pattern_bytes(tuple(terminators))
+    else:
+        pattern = _terminator_pattern(tuple(terminators))
+    start = 0
+    for match in pattern.finditer(line):
+        part = line[start : match.end()].strip()
+        if part:
+            yield part
+        start = match.end()
+    remaining = line[start:].strip()
+    if remaining:
+        yield remaining
+
+
+def split_paragraphs(line, terminators=TERMINATORS):
     """
     Splits a line after each "?" and returns a list of parts.
 
     Parameters:
         line (str): The input line to process.
+        terminators (tuple): The strings that end a part.
 
     Returns:
         list: A list of split parts.
     """
-    # Use regex to find all substrings ending with "?"
-    matches = re.findall(r'[^?]+?\?', line)
-    parts = [match.strip() for match in matches]
-    
-    # Capture any remaining text after the last "?"
-    remaining = re.sub(r'[^?]+?\?\s*', '', line).strip()
-    if remaining:
-        parts.append(remaining)
-    
-    return parts
+    return list(iter_parts(line, terminators))
 
 
-def process_text_with_nesting(text):
+def iter_nested_lines(lines, terminators=TERMINATORS, nest=True):
     """
-    Processes multiple lines of text to format them with nested bullets,
-    splitting after each "?" and nesting subsequent parts under the first.
+    Streaming version of process_text_with_nesting.
 
     Parameters:
-        text (str): The multiline input text.
+        lines (iterable): The input lines.
+        terminators (tuple): The strings that end a part.
+        nest (bool): Nest later parts under the first part of their line;
+            otherwise every part is a top-level bullet.
 
-    Returns:
-        str: The transformed text with proper formatting.
+    Yields:
+        str: Output lines, starting with %%tana%%.
     """
+    yield "%%tana%%"
+    child = "  - " if nest else "- "
+    for line in lines:
+        parts = iter_parts(line, terminators)
+        # The first part is the main bullet
+        for part in parts:
+            yield f"- {part}"
+            break
+        # Subsequent parts are nested bullets
+        for part in parts:
+            yield f"{child}{part}"
 
-    lines = text.splitlines()
-    new_lines = ["%%tana%%"]  # Start with %%tana%%
 
+def iter_nested_lines_bytes(lines, terminators=TERMINATORS, nest=True):
+    """
+    Bytes version of iter_nested_lines, for file input without decoding.
+    """
+    yield b"%%tana%%"
+    child = b"  - " if nest else b"- "
     for line in lines:
-        if not line.strip():
-            # Skip empty lines
-            continue
+        parts = iter_parts(line, terminators)
+        for part in parts:
+            yield b"- " + part
+            break
+        for part in parts:
+            yield child + part
 
-        parts = split_paragraphs(line)
 
-        if parts:
-            # The first part is the main bullet
-            main_bullet = f"- {parts[0]}"
-            new_lines.append(main_bullet)
+def process_text_with_nesting_bytes(data, terminators=TERMINATORS, nest=True):
+    """
+    Bytes version of process_text_with_nesting. Yields the output in chunks.
+    """
+    return join_lines(iter_nested_lines_bytes(iter_lines(data), terminators, nest))
 
-            # Subsequent parts are nested bullets
-            for part in parts[1:]:
-                if part:
-                    nested_bullet = f"  - {part}"
-                    new_lines.append(nested_bullet)
 
-    return "\n".join(new_lines)
+def process_text_with_nesting(text, terminators=TERMINATORS, nest=True):
+    """
+    Processes multiple lines of text to format them with nested bullets,
+    splitting after each "?" and nesting subsequent parts under the first.
+
+    Parameters:
+        text (str): The multiline input text.
+        terminators (tuple): The strings that end a part.
+        nest (bool): Nest later parts under the first part of their line.
+
+    Returns:
+        str: The transformed text with proper formatting.
+    """
+    return "\n".join(iter_nested_lines(text.splitlines(), terminators, nest))
 
 
 def main():
     """
     Main function to execute the text processing.
     """
+    parser = make_parser("Split each line after every question mark into nested Tana bullets.")
+    add_file_arguments(parser)
+    add_chunk_arguments(parser)
+    args = parser.parse_args()
+    check_chunk_arguments(parser, args)
+
+    if args.input:
+        run_file(args, "split_after_question", process_text_with_nesting_bytes, process_text_with_nesting)
+        return
+
     try:
         # Get text from the clipboard
         text = pyperclip.paste()
@@ -244,7 +325,11 @@ def main():
         print("\nProcessing...\n")
 
         # Process the text with nesting
-        transformed_text = process_text_with_nesting(text)
+        transformed_text = run(args, "split_after_question", process_text_with_nesting, text)
+
+        if args.chunks:
+            copy_chunks(transformed_text, args.max_nodes, args.max_bytes)
+            return
 
         # Copy the transformed text back to the clipboard
         pyperclip.copy(transformed_text)
@@ -83,8 +83,19 @@
 
 # -----
 
+import argparse
+import heapq
+import json
 import pyperclip
 import re
+import tempfile
+
+from byte_io import iter_lines, iter_text_lines, join_lines
+from tana_chunks import add_chunk_arguments, check_chunk_arguments, copy_chunks
+from transform_cli import add_arguments, add_file_arguments, run, run_file
+
+COLON_LINE = re.compile(r"([^:]+):\s*(.*)")
+COLON_LINE_BYTES = re.compile(rb"([^:]+):\s*(.*)")
 
 
 def split_line(line):
@@ -98,7 +109,7 @@ def split_line(line):
         tuple: A tuple containing the title and description.
     """
     # Use regex to split at the first colon
-    match = re.match(r"([^:]+):\s*(.*)", line)
+    match = COLON_LINE.match(line)
     if match:
         title = match.group(1).strip()
         description = match.group(2).strip()
@@ -108,6 +119,16 @@ def split_line(line):
         return line.strip(), ""
 
 
+def split_line_bytes(line):
+    """
+    Bytes version of split_line.
+    """
+    match = COLON_LINE_BYTES.match(line)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return line.strip(), b""
+
+
 def process_text_no_duplicates(text):
     """
     Processes multiple lines of text to format them with bullets and indentation,
@@ -140,10 +161,200 @@ def process_text_no_duplicates(text):
     return "\n".join(new_lines)
 
 
+def process_text_no_duplicates_bytes(data):
+    """
+    Bytes version of process_text_no_duplicates for file input, without
+    decoding. Yields the output in chunks.
+    """
+    yield b"%%tana%%"
+    for line in iter_lines(data):
+        if not line.strip():
+            continue
+        title, description = split_line_bytes(line)
+        if description:
+            yield b"\n- %s:\n  - %s" % (title, description)
+        else:
+            yield b"\n- %s" % title
+
+
+def normalise_title(title):
+    """
+    Returns the key used to group titles: case and whitespace are ignored,
+    so "Risk", "risk" and "Risk  " share a parent.
+    """
+    return " ".join(title.split()).casefold()
+
+
+def _group_lines(title, descriptions):
+    if descriptions:
+        yield f"- {title}:"
+        for description in descriptions:
+            yield f"  - {description}"
+    else:
+        yield f"- {title}"
+
+
+def iter_grouped_lines(lines, keep_order=True):
+    """
+    Groups every description under a single bullet per title.
+
+    Parameters:
+        lines (iterable): The input lines.
+        keep_order (bool): Emit titles in first-seen order; otherwise sort
+            them by their normalised title.
+
+    Yields:
+        str: Output lines, starting with %%tana%%, once the input is exhausted.
+    """
+    # normalised title -> (title as first seen, descriptions as an ordered set)
+    groups = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        title, description = split_line(line)
+        key = normalise_title(title)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = (title, {})
+        if description:
+            group[1][description] = None
+
+    yield "%%tana%%"
+    for key in groups if keep_order else sorted(groups):
+        title, descriptions = groups[key]
+        yield from _group_lines(title, descriptions)
+
+
+def _spill(groups):
+    # Write one sorted run of groups to a temporary file.
+    spill_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+    for key in sorted(groups):
+        title, descriptions = groups[key]
+        spill_file.write(json.dumps([key, title, list(descriptions)]) + "\n")
+    spill_file.seek(0)
+    return spill_file
+
+
+def iter_grouped_lines_spilling(lines, max_titles=100_000):
+    """
+    Bounded-memory version of iter_grouped_lines for inputs with a huge number
+    of distinct titles.
+
+    At most max_titles groups are held in memory. When there are more, the
+    groups are written to a temporary sorted run file and collection starts
+    again. The runs are merged at the end. Titles are emitted sorted by
+    their normalised title, with descriptions in first-seen order.
+
+    Parameters:
+        lines (iterable): The input lines.
+        max_titles (int): The number of groups to hold before spilling.
+
+    Yields:
+        str: Output lines, starting with %%tana%%.
+    """
+    runs = []
+    groups = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        title, description = split_line(line)
+        key = normalise_title(title)
+        group = groups.get(key)
+        if group is None:
+            if len(groups) >= max_titles:
+                runs.append(_spill(groups))
+                groups = {}
+            group = groups[key] = (title, {})
+        if description:
+            group[1][description] = None
+
+    yield "%%tana%%"
+    if not runs:
+        for key in sorted(groups):
+            yield from _group_lines(*groups[key])
+        return
+
+    runs.append(_spill(groups))
+    records = heapq.merge(*(map(json.loads, spill_file) for spill_file in runs), key=lambda record: record[0])
+    # heapq.merge keeps earlier runs first for equal keys, so first-seen order holds.
+    current_key, title, descriptions = None, None, {}
+    for key, run_title, run_descriptions in records:
+        if key != current_key:
+            if current_key is not None:
+                yield from _group_lines(title, descriptions)
+            current_key, title, descriptions = key, run_title, {}
+        descriptions.update(dict.fromkeys(run_descriptions))
+    yield from _group_lines(title, descriptions)
+    for spill_file in runs:
+        spill_file.close()
+
+
+def process_text_grouped(text, keep_order=True, max_titles=None):
+    """
+    Processes multiple lines of text like process_text_no_duplicates, but
+    gathers all descriptions for a title under one parent bullet.
+
+    Parameters:
+        text (str): The multiline input text.
+        keep_order (bool): Keep first-seen title order instead of sorting.
+        max_titles (int): If set, use the bounded-memory grouping, which
+            always sorts.
+
+    Returns:
+        str: The transformed text with proper formatting.
+    """
+    lines = text.splitlines()
+    if max_titles:
+        return "\n".join(iter_grouped_lines_spilling(lines, max_titles))
+    return "\n".join(iter_grouped_lines(lines, keep_order))
+
+
+def process_text_grouped_bytes(data, keep_order=True, max_titles=None):
+    """
+    File version of process_text_grouped. Grouping casefolds titles, so the
+    input is decoded, but a block at a time, and the output is yielded as
+    encoded chunks: with max_titles, memory stays bounded however large the
+    file is.
+    """
+    lines = iter_text_lines(data)
+    if max_titles:
+        grouped = iter_grouped_lines_spilling(lines, max_titles)
+    else:
+        grouped = iter_grouped_lines(lines, keep_order)
+    for chunk in join_lines(grouped, "\n"):
+        yield chunk.encode("utf-8")
+
+
 def main():
     """
     Main function to execute the text processing.
     """
+    parser = argparse.ArgumentParser(description="Split each line at its first colon into Tana bullets.")
+    parser.add_argument("--group", action="store_true", help="gather all descriptions under one bullet per title")
+    parser.add_argument("--sort", action="store_true", help="with --group, sort titles instead of keeping first-seen order")
+    parser.add_argument("--max-titles", type=int, help="with --group, spill to disk beyond this many distinct titles")
+    add_arguments(parser)
+    add_file_arguments(parser)
+    add_chunk_arguments(parser)
+    args = parser.parse_args()
+    check_chunk_arguments(parser, args)
+
+    if args.input:
+        if args.group:
+            # The grouped file transform decodes as it reads, so it suits any input.
+            run_file(
+                args,
+                "split_after_colon",
+                process_text_grouped_bytes,
+                process_text_grouped,
+                not args.sort,
+                args.max_titles,
+                safe=lambda data: True,
+            )
+        else:
+            run_file(args, "split_after_colon", process_text_no_duplicates_bytes, process_text_no_duplicates)
+        return
+
     try:
         # Get text from the clipboard
         text = pyperclip.paste()
@@ -152,8 +363,15 @@ def main():
         print(text)
         print("\nProcessing...\n")
 
-        # Process the text without duplicates
-        transformed_text = process_text_no_duplicates(text)
+        if args.group:
+            transformed_text = run(args, "split_after_colon", process_text_grouped, text, not args.sort, args.max_titles)
+        else:
+            # Process the text without duplicates
+            transformed_text = run(args, "split_after_colon", process_text_no_duplicates, text)
+
+        if args.chunks:
+            copy_chunks(transformed_text, args.max_nodes, args.max_bytes)
+            return
 
         # Copy the transformed text back to the clipboard
         pyperclip.copy(transformed_text)
@@ -0,0 +1,197 @@
+import itertools
+import os
+import sys
+import tempfile
+
+from byte_io import BLOCK_SIZE
+from latency import notify
+from tana_sections import line_size
+
+# Splits Tana Paste into several smaller pastes, since Tana stops responding
+# when a single paste runs to megabytes.
+#
+# A chunk only ever ends where a top-level node ends, so no subtree is split
+# between pastes: each chunk is the next few top-level subtrees under its own
+# %%tana%% header. The lines are read once, in order, and only the chunk being
+# filled and the subtree being read are held, so the output of the bytes file
+# transforms is chunked without ever being held whole. A single subtree over
+# the limits becomes a chunk of its own.
+
+DEFAULT_MAX_NODES = 5_000
+DEFAULT_MAX_BYTES = 500_000
+
+
+def add_chunk_arguments(parser):
+    group = parser.add_argument_group("chunks")
+    group.add_argument(
+        "--chunks",
+        action="store_true",
+        help="split the output into several pastes: numbered files next to --output, "
+        "or one at a time on the clipboard",
+    )
+    group.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, help="nodes per chunk, 0 for no limit")
+    group.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="bytes per chunk, 0 for no limit")
+    return parser
+
+
+def check_chunk_arguments(parser, args):
+    """
+    Chunked file output goes to numbered files, so it needs an --output path.
+    """
+    if args.chunks and args.input and args.output in (None, "-"):
+        parser.error("--chunks with --input needs an --output file")
+
+
+def iter_output_lines(chunks):
+    """
+    Yields the lines of output given as str or bytes chunks, which may hold
+    several lines or part of one. Small chunks, like the separate lines and
+    line breaks from byte_io.join_lines(), are joined up to about BLOCK_SIZE
+    and split together rather than one at a time.
+    """
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= BLOCK_SIZE:
+            lines = pending[0][:0].join(pending).split(b"\n" if isinstance(chunk, bytes) else "\n")
+            pending = [lines.pop()]  # Part of a line
+            size = len(pending[0])
+            yield from lines
+    if pending:
+        yield from pending[0][:0].join(pending).split(b"\n" if isinstance(pending[0], bytes) else "\n")
+
+
+def iter_chunks(lines, max_nodes=DEFAULT_MAX_NODES, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Groups Tana Paste lines into pastes bounded by node count and size.
+
+    Every line is a node. Code blocks are read as tana_paste_reader does: the
+    lines from a fence to its closing fence belong to the fence's node.
+
+    Parameters:
+        lines (iterable): Tana Paste lines (str or bytes), with or without
+            the %%tana%% header.
+        max_nodes (int): Nodes per chunk, 0 for no limit.
+        max_bytes (int): UTF-8 bytes per chunk, header and line breaks
+            included, 0 for no limit.
+
+    Yields:
+        list: The lines of each chunk, starting with %%tana%%.
+    """
+    lines = iter(lines)
+    for first in lines:
+        break
+    else:
+        return
+    if isinstance(first, bytes):
+        header, space, dash, fence, size = b"%%tana%%", b" ", b"-", b"```", len
+    else:
+        header, space, dash, fence, size = "%%tana%%", " ", "-", "```", line_size
+    max_nodes = max_nodes or sys.maxsize
+    max_bytes = max_bytes or sys.maxsize
+
+    chunk, chunk_bytes = [header], len(header)
+    subtree, subtree_bytes = [], 0
+    top = None  # How top-level lines start: their indent and "-"
+    in_code = False
+    for line in itertools.chain([first], lines):
+        if not line or line == header:
+            continue
+        if top is None:
+            top = line[: len(line) - len(line.lstrip(space))] + dash
+            code_fence = top + space + fence
+        if line.startswith(top):
+            if in_code:
+                in_code = line != code_fence
+            else:
+                # A new top-level node, so the previous subtree is complete.
+                if len(chunk) > 1 and (
+                    len(chunk) - 1 + len(subtree) > max_nodes or chunk_bytes + subtree_bytes > max_bytes
+                ):
+                    yield chunk
+                    chunk, chunk_bytes = [header], len(header)
+                chunk += subtree
+                chunk_bytes += subtree_bytes
+                subtree, subtree_bytes = [], 0
+                in_code = line.startswith(code_fence)
+        subtree.append(line)
+        subtree_bytes += size(line) + 1
+    if len(chunk) > 1 and (len(chunk) - 1 + len(subtree) > max_nodes or chunk_bytes + subtree_bytes > max_bytes):
+        yield chunk
+        chunk = [header]
+    chunk += subtree
+    if len(chunk) > 1:
+        yield chunk
+
+
+def chunk_path(path, number):
+    """
+    Returns the path of chunk number (from 1) for output path, e.g.
+    notes.0001.tana.txt for notes.tana.txt.
+    """
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, f"{stem}.{number:04d}{dot}{extension}")
+
+
+def write_chunks(path, chunks):
+    """
+    Writes each chunk to its numbered file (see chunk_path).
+
+    Returns:
+        tuple: (number of chunks, bytes written).
+    """
+    count = written = 0
+    for count, chunk in enumerate(chunks, start=1):
+        data = b"\n".join(chunk) if isinstance(chunk[0], bytes) else "\n".join(chunk).encode("utf-8")
+        with open(chunk_path(path, count), "wb") as f:
+            f.write(data)
+        written += len(data)
+    return count, written
+
+
+def copy_chunks(text, max_nodes=DEFAULT_MAX_NODES, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Copies Tana Paste to the clipboard a chunk at a time, waiting for Enter
+    between chunks so each can be pasted into Tana first.
+
+    Hotkey scripts usually run without a terminal to press Enter in. Then
+    every chunk is written to a numbered file in a new temporary folder
+    instead, the first is copied, and a notification says where the rest are.
+
+    Returns:
+        int: The number of chunks copied to the clipboard.
+    """
+    import pyperclip
+
+    chunks = iter_chunks(text.split("\n"), max_nodes, max_bytes)
+    first = next(chunks, None)
+    if first is None:
+        return 0
+    second = next(chunks, None)
+    if second is not None and not sys.stdin.isatty():
+        directory = tempfile.mkdtemp(prefix="tana-chunks-")
+        path = os.path.join(directory, "paste.tana.txt")
+        count, _ = write_chunks(path, itertools.chain([first, second], chunks))
+        pyperclip.copy("\n".join(first))
+        notify(
+            f"The paste was split into {count} chunks. Only chunk 1 is on the clipboard; "
+            f"all {count} are in {directory}."
+        )
+        return 1
+
+    count = 0
+    for count, chunk in enumerate(itertools.chain([first], [second] if second else [], chunks), start=1):
+        if count > 1:
+            try:
+                input("Press Enter to copy the next chunk, or Ctrl+C to stop. ")
+            except (EOFError, KeyboardInterrupt):
+                print(f"\nStopped after {count - 1} chunks; the rest were not copied.")
+                return count - 1
+        pyperclip.copy("\n".join(chunk))
+        print(f"Chunk {count} ({len(chunk) - 1} nodes) has been copied to your clipboard.")
+    if count > 1:
+        print("That was the last chunk.")
+    return count
@@ -0,0 +1,433 @@
+#!/opt/homebrew/bin/python3
+
+# Reads Tana Paste (the %%tana%% bullet format written by the converter and
+# the split scripts) back in, one line at a time.
+#
+#   python tana_paste_reader.py to-markdown export.tana.txt notes.md
+#   python tana_paste_reader.py compare a.tana.txt b.tana.txt
+#   python tana_paste_reader.py roundtrip export.tana.txt
+#
+# iter_nodes() turns the bullets into (depth, kind, text) events without
+# building a tree; it only keeps the indents of the open ancestors, so memory
+# stays constant however large the paste is. write_markdown_file() also
+# streams: it finds the last plain top-level node on a first read, and reads
+# ahead for the nodes above code blocks (iter_heading_ids) with a second.
+# roundtrip() converts the Markdown back a section at a time (see
+# markdown_sections), so it streams too.
+
+import argparse
+import functools
+import io
+import itertools
+import os
+import sys
+import tempfile
+
+import pyperclip
+
+BUFFER_SIZE = 1 << 20
+SECTION_SIZE = 1 << 20  # Markdown bytes roundtrip() converts at a time, at least
+
+# Event kinds
+HEADING1 = "heading1"  # - !! text
+HEADING = "heading"  # - **text**
+ITEM = "item"  # - text
+CODE_START = "code_start"  # - ```lang  (text is the language)
+CODE_LINE = "code_line"  # one line of code, leading spaces kept
+CODE_END = "code_end"  # - ```
+
+
+def iter_nodes(lines):
+    """
+    Parses Tana Paste lines into node events.
+
+    Depth comes from the indentation relative to the open ancestors, not from
+    a fixed width, so the extra indentation the converter gives children of a
+    colon-terminated line is just ordinary nesting.
+
+    Parameters:
+        lines (iterable): Lines of Tana Paste, with or without newlines.
+
+    Yields:
+        tuple: (depth, kind, text), with depth 1 for top-level nodes.
+    """
+    indents = []  # indents of the open ancestors
+    code_indent = None  # indent of the open code fence, if any
+    code_depth = 0
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.lstrip(" ")
+        if not stripped.startswith("-"):
+            if not stripped.strip() or line == "%%tana%%":
+                continue
+            raise ValueError(f"Not a Tana Paste bullet: {line!r}")
+        indent = len(line) - len(stripped)
+        text = stripped[2:] if stripped.startswith("- ") else stripped[1:]
+
+        if code_indent is not None:
+            if indent == code_indent and text == "```":
+                code_indent = None
+                yield code_depth, CODE_END, ""
+            else:
+                yield code_depth, CODE_LINE, text
+            continue
+
+        while indents and indent <= indents[-1]:
+            indents.pop()
+        depth = len(indents) + 1
+
+        if text.startswith("```"):
+            # Code lines are bullets at the fence's indent, up to the closing fence.
+            code_indent, code_depth = indent, depth
+            yield depth, CODE_START, text[3:]
+            continue
+
+        indents.append(indent)
+        if text.startswith("!! "):
+            yield depth, HEADING1, text[3:]
+        elif len(text) > 4 and text.startswith("**") and text.endswith("**"):
+            yield depth, HEADING, text[2:-2]
+        else:
+            yield depth, ITEM, text
+
+
+def iter_heading_ids(events):
+    """
+    Finds the nodes write_markdown must write as Markdown headings. The
+    converter puts a code block under the last heading, so the parent of
+    every code block, and that parent's ancestors, must be headings.
+
+    Subtrees are contiguous, so an ancestor not yet found comes after every
+    one found before: the ids come out in increasing order, each once, and
+    only the open nodes are held. Read from a second reader of the paste,
+    they can be taken alongside the events without being collected.
+
+    Yields:
+        int: Node ids, counting events from 0.
+    """
+    open_nodes = []
+    found = -1
+    for node_id, (depth, kind, _) in enumerate(events):
+        if kind == CODE_LINE or kind == CODE_END:
+            continue
+        del open_nodes[depth - 1 :]
+        if kind == CODE_START:
+            for ancestor in open_nodes:
+                if ancestor > found:
+                    found = ancestor
+                    yield ancestor
+        open_nodes.append(node_id)
+
+
+def last_plain_top_level(events):
+    """
+    Returns the id of the last top-level node that isn't "!! ", or -1. At the
+    top level, a "# " heading would take every later top-level node as a
+    child, so write_markdown writes "!! " nodes before this one as bold
+    lines instead.
+    """
+    last = -1
+    for node_id, (depth, kind, _) in enumerate(events):
+        if depth == 1 and kind != HEADING1 and kind != CODE_LINE and kind != CODE_END:
+            last = node_id
+    return last
+
+
+def _literal(kind, text):
+    if kind == HEADING1:
+        return f"!! {text}"
+    if kind == HEADING:
+        return f"**{text}**"
+    return text
+
+
+def write_markdown(events, out, plan=None):
+    """
+    Writes node events as Markdown that the converter turns back into the same
+    outline.
+
+    Nodes are written as nested bullets with their Tana text ("- **B**" reads
+    back as the same heading), apart from the ones the converter can only
+    attach to a heading: code blocks go under the last heading, so their
+    ancestors are written as "#" headings (see iter_heading_ids), and once one
+    child of a node is a heading, its later siblings must be headings too.
+    Headings are "#" headings one level below their parent heading; where
+    that can't work (a top-level "!! " node followed by other top-level
+    nodes, or past level 6) they are bold lines.
+
+    Parameters:
+        events (iterable): Node events from iter_nodes().
+        out (file): Where the Markdown is written.
+        plan (tuple): (iter_heading_ids(), last_plain_top_level()) of the
+            same events. Without it the events are read into a list to plan
+            them first; write_markdown_file() streams instead.
+    """
+    if plan is None:
+        events = list(events)
+        plan = (iter_heading_ids(events), last_plain_top_level(events))
+    heading_ids, last_other = plan
+    heading_ids = iter(heading_ids)
+    next_heading = next(heading_ids, None)
+
+    # [node id, Markdown heading level (0 for a bold line, None for a
+    # bullet), a child has been written as a heading] per open node. The
+    # headings are always a prefix.
+    root = [None, 0, False]
+    open_nodes = []
+    headings = 0
+
+    for node_id, (depth, kind, text) in enumerate(events):
+        if kind == CODE_LINE:
+            out.write(text + "\n")
+            continue
+        if kind == CODE_END:
+            out.write("```\n")
+            continue
+
+        del open_nodes[depth - 1 :]
+        headings = min(headings, len(open_nodes))
+        parent = open_nodes[-1] if open_nodes else root
+
+        while next_heading is not None and next_heading < node_id:
+            next_heading = next(heading_ids, None)
+        level = None
+        if (next_heading == node_id or parent[2]) and headings == len(open_nodes) and parent[1] is not None:
+            if parent is root:
+                if kind == HEADING1:
+                    level = 1 if node_id > last_other else 0
+                elif kind == HEADING:
+                    level = 2
+            elif kind == HEADING and parent[1]:
+                level = parent[1] + 1 if parent[1] < 6 else 0
+
+        if level is not None:
+            out.write(f"{'#' * level} {text}\n" if level else f"**{text}**\n")
+            parent[2] = True
+            open_nodes.append([node_id, level, False])
+            headings += 1
+            continue
+
+        if kind == CODE_START:
+            out.write(f"```{text}\n")
+        else:
+            out.write(f"{'  ' * (depth - 1 - headings)}- {_literal(kind, text)}\n")
+        open_nodes.append([node_id, None, False])
+
+
+def write_markdown_file(open_paste, out):
+    """
+    write_markdown for a paste that can be opened more than once, without
+    holding it: one read finds the last plain top-level node, then a second
+    writes the Markdown while a third runs ahead for the heading ids.
+
+    Parameters:
+        open_paste (callable): Returns the paste as a new file object.
+        out (file): Where the Markdown is written.
+    """
+    with open_paste() as paste:
+        last_plain = last_plain_top_level(iter_nodes(paste))
+    with open_paste() as paste, open_paste() as ahead:
+        write_markdown(iter_nodes(paste), out, (iter_heading_ids(iter_nodes(ahead)), last_plain))
+
+
+def first_difference(events_a, events_b):
+    """
+    Compares two event streams in constant memory.
+
+    Returns:
+        tuple: (index, event from a, event from b) for the first difference,
+        or None if the streams are equal. A missing event is None.
+    """
+    for index, (a, b) in enumerate(itertools.zip_longest(events_a, events_b)):
+        if a != b:
+            return index, a, b
+    return None
+
+
+def markdown_sections(lines, size=SECTION_SIZE):
+    """
+    Finds where Markdown can be split so that every section converts on its
+    own to the same Tana Paste as it does within the whole document.
+
+    Lines are read as _build_tree reads them. A section starts at a line the
+    converter attaches to the root while its state is as good as fresh: a
+    heading with no lower-level heading open, a bold line before any "#"
+    heading, or another unindented line before any heading or bold line.
+    None may follow a top-level node ending with a colon, which takes the
+    next top-level nodes of its level as children. The converter also
+    attaches a line to an earlier colon-terminated line less indented than
+    it, so a line that reaches back into an earlier section merges the
+    sections in between.
+
+    Parameters:
+        lines (iterable): The Markdown as bytes lines, with their line breaks.
+        size (int): The smallest section worth splitting off, in bytes.
+
+    Returns:
+        list: Byte offsets where sections start, after the first.
+    """
+    from markdown_to_tana_paste import classify_line
+
+    splits = []
+    offset = 0
+    in_code = False
+    code_start = None  # Where the open code block can start a section, if it can
+    open_levels = [False] * 7  # Heading levels with an open heading
+    current = "root"  # The node unmarked lines go under: "root", "root bold" or "heading"
+    colons = []  # (indent, offset) of the colon-terminated lines taking children
+    list_indents = []
+    colon_level = None  # Level of the top-level colon-terminated node taking its next siblings
+
+    for raw in lines:
+        raw_start = offset
+        offset += len(raw)
+        start = raw_start  # Only the first line of raw can start a section
+        for line in raw.decode("utf-8").splitlines():
+            line_start, start = start, None
+            if line.strip().startswith("```"):
+                in_code = not in_code
+                if in_code:
+                    code_start = line_start
+                    continue
+                # The code block becomes a placeholder line where it ends.
+                kind, indent, content, level = "text", 0, "CODE_BLOCK_PLACEHOLDER", 0
+                line_start = code_start
+            elif in_code:
+                continue
+            else:
+                token = classify_line(line)
+                if token is None:
+                    continue
+                kind, indent, content, level = token
+
+            if kind == "heading":
+                at_root = not any(open_levels[1:level])
+            elif kind == "bold":
+                at_root = current != "heading"
+            else:
+                if kind == "text" and indent == 0:
+                    list_indents = []
+                taken = next((colon for colon in reversed(colons) if indent > colon[0]), None)
+                if taken is None or kind != "text":
+                    while list_indents and indent <= list_indents[-1]:
+                        list_indents.pop()
+                at_root = taken is None and not list_indents and current == "root"
+                if kind != "text":
+                    list_indents.append(indent)
+                if taken is not None:
+                    while splits and splits[-1] > taken[1]:
+                        splits.pop()
+
+            if at_root:
+                if (
+                    line_start is not None
+                    and colon_level is None
+                    and line_start - (splits[-1] if splits else 0) >= size
+                    and (kind in ("heading", "bold") or indent == 0)
+                ):
+                    splits.append(line_start)
+                node_level = level if kind == "heading" else 1
+                if node_level != colon_level:
+                    colon_level = node_level if content.rstrip().endswith(":") else None
+
+            if kind == "heading" or kind == "bold":
+                if kind == "heading":
+                    open_levels[level:] = [True] + [False] * (6 - level)
+                current = "root bold" if kind == "bold" and at_root else "heading"
+                colons = [(indent, raw_start)] if content.endswith(":") else []
+                list_indents = []
+            elif content.endswith(":"):
+                colons = [colon for colon in colons if colon[0] < indent]
+                colons.append((indent, raw_start))
+    return splits
+
+
+def _convert_sections(markdown, splits):
+    # Yields the Tana Paste lines of each section of the Markdown file in turn.
+    from byte_io import ascii_safe
+    from markdown_to_tana_paste import convert_markdown, convert_markdown_bytes
+
+    markdown.seek(0)
+    for start, end in zip([0] + splits, splits + [None]):
+        section = markdown.read() if end is None else markdown.read(end - start)
+        if ascii_safe(section):
+            converted = b"".join(convert_markdown_bytes(section)).decode("ascii")
+        else:
+            converted = convert_markdown(str(section, "utf-8"))
+        yield from converted.split("\n")
+
+
+def roundtrip(path, section_size=SECTION_SIZE):
+    """
+    Converts a Tana Paste file to Markdown and back, and compares the outlines.
+
+    Outlines the converter produces from colon-free Markdown survive exactly.
+    Under a line ending with a colon the converter attaches every deeper line
+    to that line, so deeper nesting there can't be expressed in Markdown and
+    is reported as a difference.
+
+    The Markdown is written with write_markdown_file() to a temporary file.
+    It is converted back a section at a time (see markdown_sections) and
+    compared as it streams, so memory follows the largest section, not the
+    size of the paste. Sections hold whole top-level nodes, so a single
+    top-level node larger than section_size is converted whole, and so are
+    the top-level nodes between a colon-terminated line and a later line the
+    converter attaches to it, which makes the round trip fail anyway.
+    """
+    open_paste = functools.partial(open, path, encoding="utf-8", buffering=BUFFER_SIZE)
+    with tempfile.TemporaryDirectory() as directory:
+        markdown_path = os.path.join(directory, "roundtrip.md")
+        with open(markdown_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as markdown:
+            write_markdown_file(open_paste, markdown)
+        with open(markdown_path, "rb", buffering=BUFFER_SIZE) as markdown, open_paste() as f:
+            splits = markdown_sections(markdown, section_size)
+            return first_difference(iter_nodes(f), iter_nodes(_convert_sections(markdown, splits)))
+
+
+def _report(difference):
+    if difference is None:
+        print("Equivalent.")
+        return 0
+    index, a, b = difference
+    print(f"First difference at node {index}:\n  {a}\n  {b}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read Tana Paste back: convert to Markdown or compare outlines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_markdown = commands.add_parser("to-markdown", help="convert Tana Paste to Markdown")
+    to_markdown.add_argument("input", nargs="?", help="Tana Paste file (default: the clipboard)")
+    to_markdown.add_argument("output", nargs="?", help="Markdown file (default: the clipboard)")
+    compare = commands.add_parser("compare", help="check two Tana Paste files describe the same outline")
+    compare.add_argument("a")
+    compare.add_argument("b")
+    check = commands.add_parser("roundtrip", help="check Tana Paste -> Markdown -> Tana Paste keeps the outline")
+    check.add_argument("input")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.a, encoding="utf-8", buffering=BUFFER_SIZE) as a, open(
+            args.b, encoding="utf-8", buffering=BUFFER_SIZE
+        ) as b:
+            sys.exit(_report(first_difference(iter_nodes(a), iter_nodes(b))))
+    if args.command == "roundtrip":
+        sys.exit(_report(roundtrip(args.input)))
+
+    if args.input:
+        open_paste = functools.partial(open, args.input, encoding="utf-8", buffering=BUFFER_SIZE)
+    else:
+        open_paste = functools.partial(io.StringIO, pyperclip.paste())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", buffering=BUFFER_SIZE) as out:
+            write_markdown_file(open_paste, out)
+    else:
+        out = io.StringIO()
+        write_markdown_file(open_paste, out)
+        pyperclip.copy(out.getvalue())
+        print("The Markdown has been copied to your clipboard.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/opt/homebrew/bin/python3
+
+# Pulls single sections out of a large Tana Paste file without converting
+# the Markdown again.
+#
+#   python markdown_to_tana_paste.py --input notes.md --output notes.tana.txt --index
+#   python tana_sections.py notes.tana.txt "Project > Q3 > Risks"
+#   python tana_sections.py notes.tana.txt "Project > Q3" --prefix --copy
+#   python tana_sections.py notes.tana.txt --list "Project >"
+#
+# The converter's --index writes notes.tana.txt.index next to the output: one
+# "heading path<TAB>start<TAB>end" line per heading, sorted by path, giving
+# the byte range of the heading's subtree in the output. Lookups binary
+# search the memory-mapped index, so they take O(log n) seeks however large
+# the index is, and the sections are sliced straight out of the mapped output.
+
+import argparse
+import mmap
+import sys
+
+HEADER = "%%tana%%"
+SEPARATOR = " > "
+INDEX_SUFFIX = ".index"
+
+
+class SectionIndex:
+    """
+    Collects the byte range of every heading's subtree while Tana Paste is
+    written. The writer calls line() for every line after %%tana%%, in order,
+    and finish() at the end.
+    """
+
+    def __init__(self):
+        self.entries = []  # (heading path, start, end)
+        self._open = []  # (depth, heading path, start) of headings still being written
+        self._position = len(HEADER)  # Bytes written so far
+
+    def line(self, depth, size, heading=None):
+        """
+        Parameters:
+            depth (int): The line's depth, 1 for top-level nodes.
+            size (int): The line's length in UTF-8 bytes.
+            heading (str): The heading text, if the line is a heading.
+        """
+        while self._open and self._open[-1][0] >= depth:
+            _, path, start = self._open.pop()
+            self.entries.append((path, start, self._position))
+        start = self._position + 1  # After the line break
+        self._position = start + size
+        if heading is not None:
+            path = self._open[-1][1] + SEPARATOR + heading if self._open else heading
+            self._open.append((depth, path, start))
+
+    def finish(self):
+        while self._open:
+            _, path, start = self._open.pop()
+            self.entries.append((path, start, self._position))
+
+
+def line_size(line):
+    """
+    Returns the UTF-8 length of a str line, without encoding ASCII lines.
+    """
+    return len(line) if line.isascii() else len(line.encode("utf-8"))
+
+
+def write_index(path, index):
+    """
+    Writes the entries sorted by path (bytewise, as the lookups compare them).
+    """
+    entries = sorted((heading_path.encode("utf-8"), start, end) for heading_path, start, end in index.entries)
+    with open(path, "wb") as f:
+        f.writelines(b"%s\t%d\t%d\n" % entry for entry in entries)
+
+
+def _parse_entry(line):
+    heading_path, start, end = line.rsplit(b"\t", 2)
+    return heading_path, int(start), int(end)
+
+
+def _first_at_least(index, key):
+    # Binary search over lines: each probe seeks to the middle of the range
+    # and reads the line around it.
+    low, high = 0, len(index)
+    while low < high:
+        middle = (low + high) // 2
+        line_start = index.rfind(b"\n", 0, middle) + 1
+        line_end = index.find(b"\n", middle)
+        if line_end < 0:
+            line_end = len(index)
+        if line_end <= line_start or index[line_start:line_end].rsplit(b"\t", 2)[0] < key:
+            low = line_end + 1
+        else:
+            high = line_start
+    return low
+
+
+def lookup(index, heading_path, prefix=False):
+    """
+    Finds the entries for a heading path in a memory-mapped index.
+
+    Parameters:
+        index (mmap): The index file.
+        heading_path (str): e.g. "Project > Q3 > Risks".
+        prefix (bool): Match every path starting with heading_path.
+
+    Yields:
+        tuple: (heading path as bytes, start, end), in path order.
+    """
+    key = heading_path.encode("utf-8")
+    position = _first_at_least(index, key)
+    while position < len(index):
+        line_end = index.find(b"\n", position)
+        if line_end < 0:
+            line_end = len(index)
+        entry = _parse_entry(index[position:line_end])
+        if not (entry[0].startswith(key) if prefix else entry[0] == key):
+            return
+        yield entry
+        position = line_end + 1
+
+
+def dedent_section(section):
+    """
+    Moves a section's lines left so its heading is a top-level bullet.
+    """
+    lines = section.split(b"\n")
+    indent = len(lines[0]) - len(lines[0].lstrip(b" "))
+    return b"\n".join(line[indent:] for line in lines)
+
+
+def extract(output, index, heading_paths, prefix=False):
+    """
+    Extracts sections from a memory-mapped Tana Paste output as one paste.
+    Sections inside another extracted section aren't repeated.
+
+    Returns:
+        bytes: %%tana%% followed by the dedented sections, in output order.
+    """
+    ranges = sorted({(start, end) for path in heading_paths for _, start, end in lookup(index, path, prefix)})
+    sections = []
+    covered = -1
+    for start, end in ranges:
+        if end <= covered:
+            continue
+        sections.append(dedent_section(output[start:end]))
+        covered = end
+    return b"\n".join([HEADER.encode("ascii")] + sections)
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return b""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract sections of a converted Tana Paste file by heading path.")
+    parser.add_argument("output", help="Tana Paste file written with the converter's --index")
+    parser.add_argument("paths", nargs="*", help='heading paths, e.g. "Project > Q3 > Risks"')
+    parser.add_argument("--prefix", action="store_true", help="match every heading path starting with each path")
+    parser.add_argument("--list", action="store_true", help="list the heading paths starting with the given paths")
+    parser.add_argument("--copy", action="store_true", help="copy the sections to the clipboard instead of printing")
+    parser.add_argument("--index", help=f"index file (default: OUTPUT{INDEX_SUFFIX})")
+    args = parser.parse_intermixed_args()
+
+    index = _map(args.index or args.output + INDEX_SUFFIX)
+    if args.list:
+        for path in args.paths or [""]:
+            for heading_path, _, _ in lookup(index, path, prefix=True):
+                print(heading_path.decode("utf-8"))
+        return
+    if not args.paths:
+        parser.error("give at least one heading path, or --list")
+
+    result = extract(_map(args.output), index, args.paths, args.prefix)
+    if result.count(b"\n") == 0:
+        print("No matching sections.", file=sys.stderr)
+        sys.exit(1)
+    if args.copy:
+        import pyperclip
+
+        pyperclip.copy(result.decode("utf-8"))
+        print("The sections have been copied to your clipboard.")
+    else:
+        sys.stdout.buffer.write(result + b"\n")
+
+
+if __name__ == "__main__":
+    main()
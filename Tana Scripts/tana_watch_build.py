@@ -0,0 +1,318 @@
+#!/opt/homebrew/bin/python3
+
+# Keeps a folder of Tana Paste exports in sync with a folder of Markdown notes.
+#
+#   python tana_watch_build.py ~/Notes ~/Notes-Tana          build once
+#   python tana_watch_build.py ~/Notes ~/Notes-Tana --watch  rebuild on changes
+#
+# A manifest in the output folder records (size, mtime, content hash, output)
+# for every note. Notes whose size and mtime are unchanged are skipped on the
+# stat alone; the rest are hashed and only reconverted if their content
+# changed. Conversions run in a process pool. A note that can't be read or
+# converted is reported and kept in the manifest without its hash, so it is
+# retried on the next build and its output is still removed with it, and the
+# rest of the build carries on.
+#
+# note.md and note.markdown would both be converted to note.tana.txt. Only the
+# .md note is converted then, and the other is reported.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from markdown_to_tana_paste import convert_markdown
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Fall back to polling
+    Observer = None
+
+MANIFEST_NAME = ".tana-manifest.json"
+OUTPUT_SUFFIX = ".tana.txt"
+SOURCE_SUFFIXES = (".md", ".markdown")
+POLL_INTERVAL = 2.0  # Seconds between scans when watchdog isn't installed
+DEBOUNCE = 0.5  # Seconds without changes before a rebuild starts
+
+
+def scan(source_dir):
+    """
+    Finds every Markdown file under source_dir.
+
+    Returns:
+        dict: {relative path: (size, mtime_ns)}
+    """
+    found = {}
+    # (directory, its path relative to source_dir with a trailing separator)
+    pending = [(source_dir, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    pending.append((entry.path, prefix + entry.name + os.sep))
+                elif entry.name.endswith(SOURCE_SUFFIXES):
+                    stat = entry.stat()
+                    found[prefix + entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+def output_name(relative_path):
+    return os.path.splitext(relative_path)[0] + OUTPUT_SUFFIX
+
+
+def _retry_entry(relative_path):
+    # A manifest entry that never matches, so the note is converted again.
+    return [None, None, None, output_name(relative_path)]
+
+
+def find_clashes(found):
+    """
+    Finds notes whose output name is taken by another note, preferring the
+    suffixes in SOURCE_SUFFIXES order.
+
+    Returns:
+        tuple: ({output name: relative path of the note converted to it},
+        {relative path: the note converted in its place})
+    """
+    owners = {}
+    clashes = {}
+    for relative_path in sorted(found, key=lambda path: SOURCE_SUFFIXES.index(os.path.splitext(path)[1])):
+        name = output_name(relative_path)
+        if name in owners:
+            clashes[relative_path] = owners[name]
+        else:
+            owners[name] = relative_path
+    return owners, clashes
+
+
+def _convert_file(job):
+    # Runs in a worker: hash the note, and convert it unless the hash matches.
+    # Returns (size, mtime_ns, digest, converted, error), with error None
+    # unless the note couldn't be read or converted.
+    source_path, output_path, old_hash = job
+    try:
+        with open(source_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != old_hash or not os.path.exists(output_path):
+            result = convert_markdown(data.decode("utf-8"))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(result)
+            converted = True
+        else:
+            converted = False
+    except Exception as e:
+        return None, None, None, False, f"{type(e).__name__}: {e}"
+    return stat.st_size, stat.st_mtime_ns, digest, converted, None
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    # Write to a temporary file first so an interrupted build can't corrupt it.
+    directory = os.path.dirname(path)
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(f.name, path)
+
+
+def build(source_dir, output_dir, workers=None):
+    """
+    Brings output_dir up to date with source_dir.
+
+    Returns:
+        dict: Counts of converted, unchanged (hash matched), skipped (stat
+        matched), removed and failed notes. Notes skipped for an output name
+        clash count as failed.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    found = scan(source_dir)
+    owners, clashes = find_clashes(found)
+    for relative_path, owner in clashes.items():
+        print(f"Skipping {relative_path}: {owner} is converted to {output_name(owner)}", file=sys.stderr)
+        del found[relative_path]
+
+    removed = [relative_path for relative_path in manifest if relative_path not in found]
+    for relative_path in removed:
+        name = manifest.pop(relative_path)[3]
+        owner = owners.get(name)
+        if owner is not None:
+            # The output now belongs to another note, so rewrite it rather than remove it.
+            if owner in manifest:
+                manifest[owner] = _retry_entry(owner)
+            continue
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except FileNotFoundError:
+            pass
+
+    jobs = []
+    for relative_path, (size, mtime_ns) in found.items():
+        entry = manifest.get(relative_path)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            continue
+        jobs.append(relative_path)
+
+    counts = {
+        "converted": 0,
+        "unchanged": 0,
+        "skipped": len(found) - len(jobs),
+        "removed": len(removed),
+        "failed": len(clashes),
+    }
+    if jobs:
+        arguments = [
+            (
+                os.path.join(source_dir, relative_path),
+                os.path.join(output_dir, output_name(relative_path)),
+                manifest.get(relative_path, [None] * 4)[2],
+            )
+            for relative_path in jobs
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_convert_file, arguments, chunksize=max(1, len(jobs) // 64))
+            for relative_path, (size, mtime_ns, digest, converted, error) in zip(jobs, results):
+                if error is not None:
+                    print(f"Couldn't convert {relative_path}: {error}", file=sys.stderr)
+                    manifest[relative_path] = _retry_entry(relative_path)
+                    counts["failed"] += 1
+                    continue
+                manifest[relative_path] = [size, mtime_ns, digest, output_name(relative_path)]
+                counts["converted" if converted else "unchanged"] += 1
+
+    if jobs or removed:
+        save_manifest(manifest_path, manifest)
+
+    # Conversions run in worker processes, so they are recorded here.
+    metrics.BUILD_CONVERSIONS.inc(counts["converted"])
+    metrics.BUILD_CACHE_HITS.inc(counts["skipped"], check="stat")
+    metrics.BUILD_CACHE_HITS.inc(counts["unchanged"], check="hash")
+    metrics.ERRORS.inc(counts["failed"], transform="build")
+    metrics.DURATION.observe(time.perf_counter() - start, transform="build")
+    return counts
+
+
+def watch(source_dir, output_dir, workers=None, metrics_file=None):
+    """
+    Rebuilds whenever notes change, once they have been quiet for DEBOUNCE seconds.
+    Uses watchdog events if it is installed, otherwise polls. After each
+    build the metrics are written to metrics_file, if given.
+    """
+    if Observer is not None:
+        last_event = [None]
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                last_event[0] = time.monotonic()
+
+        observer = Observer()
+        observer.schedule(Handler(), source_dir, recursive=True)
+        observer.start()
+        try:
+            while True:
+                time.sleep(DEBOUNCE / 2)
+                if last_event[0] is not None and time.monotonic() - last_event[0] >= DEBOUNCE:
+                    last_event[0] = None
+                    report(build(source_dir, output_dir, workers), metrics_file)
+        finally:
+            observer.stop()
+            observer.join()
+
+    built = scan(source_dir)
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = scan(source_dir)
+        if current == built:
+            continue
+        # Wait for the changes to settle before building.
+        while True:
+            time.sleep(DEBOUNCE)
+            settled = scan(source_dir)
+            if settled == current:
+                break
+            current = settled
+        report(build(source_dir, output_dir, workers), metrics_file)
+        built = current
+
+
+def report(counts, metrics_file=None):
+    print(
+        f"{counts['converted']} converted, {counts['unchanged']} unchanged, "
+        f"{counts['skipped']} skipped, {counts['removed']} removed, {counts['failed']} failed."
+    )
+    if metrics_file:
+        metrics.write_textfile(metrics_file)
+
+
+def benchmark(count=50_000):
+    """
+    Times a full build and a no-op rebuild of count generated notes.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        source_dir = os.path.join(root, "notes")
+        output_dir = os.path.join(root, "tana")
+        for i in range(count):
+            directory = os.path.join(source_dir, f"folder{i // 1000}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"note{i}.md"), "w") as f:
+                f.write(f"# Note {i}\n- first point\n- second point:\n  - detail\n")
+
+        start = time.perf_counter()
+        build(source_dir, output_dir)
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = build(source_dir, output_dir)
+        noop = time.perf_counter() - start
+        print(f"{count} notes: full build {full:.2f}s, no-op rebuild {noop:.3f}s")
+        assert counts["skipped"] == count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a folder of Markdown notes to Tana Paste, incrementally.")
+    parser.add_argument("source", nargs="?", help="folder of Markdown notes")
+    parser.add_argument("output", nargs="?", help="folder for the Tana Paste files and the manifest")
+    parser.add_argument("--watch", action="store_true", help="keep running and rebuild when notes change")
+    parser.add_argument("--workers", type=int, help="conversion processes (default: one per CPU)")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="time a build and no-op rebuild of N notes")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.source or not args.output:
+        parser.error("source and output folders are required")
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    report(build(args.source, args.output, args.workers), args.metrics_file)
+    if args.watch:
+        print("Watching for changes. Press Ctrl+C to stop.")
+        try:
+            watch(args.source, args.output, args.workers, args.metrics_file)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
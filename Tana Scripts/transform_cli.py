@@ -0,0 +1,118 @@
+import argparse
+import sys
+
+from byte_io import bytes_safe, open_input, write_output
+from latency import DATA_PATH, load_scaling, run_with_budget
+from metrics import OUTPUT_BYTES, instrument, write_textfile
+from profiling import DEFAULT_DIR, profile_call, sample_call
+from tana_chunks import chunk_path, iter_chunks, iter_output_lines, write_chunks
+
+# Command-line options shared by every transform script, and run(), which
+# applies them around the transform itself. Scripts with a bytes version of
+# their transform also take --input/--output and use run_file(), which also
+# writes chunked output for scripts with tana_chunks.add_chunk_arguments().
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("profiling")
+    mode = group.add_mutually_exclusive_group()
+    mode.add_argument("--profile", action="store_true", help="run under cProfile and tracemalloc and write a report")
+    mode.add_argument("--profile-sample", action="store_true", help="low-overhead stack sampling, for long runs")
+    group.add_argument("--profile-dir", default=DEFAULT_DIR, help=f"where reports are written (default: {DEFAULT_DIR})")
+    group.add_argument("--profile-top", type=int, default=20, metavar="N", help="functions/allocation sites to report")
+    group = parser.add_argument_group("latency")
+    group.add_argument("--budget", type=float, metavar="SECONDS", help="latency budget, 0 for none (default: per script)")
+    group.add_argument("--latency-data", default=DATA_PATH, metavar="PATH", help="scaling data from benchmarks.py --save")
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-file", metavar="PATH", help="write Prometheus text metrics here afterwards")
+    return parser
+
+
+def add_file_arguments(parser):
+    group = parser.add_argument_group("files")
+    group.add_argument("--input", metavar="PATH", help="read a file (- for stdin) instead of the clipboard")
+    group.add_argument("--output", metavar="PATH", help="with --input, write here instead of stdout")
+    return parser
+
+
+def make_parser(description):
+    return add_arguments(argparse.ArgumentParser(description=description))
+
+
+def run(args, name, transform, text, *extra, fallback=None):
+    """
+    Calls transform(text, *extra), profiled if the options ask for it, and
+    otherwise within the latency budget (see latency.py). The call is
+    recorded in the metrics (see metrics.py).
+
+    Parameters:
+        args (Namespace): Parsed options from a parser with add_arguments().
+        name (str): The transform name, used for report filenames and to
+            look up the budget and scaling data.
+        transform (callable): The transform to run.
+        text (str): The input text.
+        fallback (callable): A cheaper transform with the same arguments,
+            for inputs projected to exceed the budget.
+
+    Returns:
+        The transform's result.
+    """
+    transform = instrument(name, transform)
+    if fallback is not None:
+        fallback = instrument(name, fallback)
+    try:
+        if args.profile or args.profile_sample:
+            call = profile_call if args.profile else sample_call
+            input_bytes = len(text) if not isinstance(text, str) else len(text.encode("utf-8"))
+            return call(name, transform, (text, *extra), input_bytes, args.profile_dir, args.profile_top)
+        scaling = load_scaling(args.latency_data)
+        return run_with_budget(name, transform, (text, *extra), len(text), args.budget, fallback, scaling)
+    finally:
+        if args.metrics_file:
+            write_textfile(args.metrics_file)
+
+
+def run_file(args, name, bytes_transform, text_transform, *extra, safe=bytes_safe):
+    """
+    Runs a transform on args.input and writes the result to args.output.
+
+    The input stays bytes when safe(data) says the bytes transform gives the
+    same result as the str transform; otherwise it is decoded as UTF-8 and
+    the result encoded again. With --chunks the output is written as
+    numbered Tana Paste files instead (see tana_chunks.py).
+
+    Parameters:
+        args (Namespace): Parsed options from a parser with add_arguments()
+            and add_file_arguments().
+        name (str): The transform name, used for report filenames.
+        bytes_transform (callable): Takes the bytes-like input and returns an
+            iterable of bytes chunks, or None if there is no bytes version.
+        text_transform (callable): Takes the decoded input and returns a str.
+        safe (callable): Decides whether the bytes transform can be used.
+    """
+
+    def write(chunks):
+        if not getattr(args, "chunks", False):
+            return write_output(args.output, chunks)
+        lines = iter_output_lines(chunks)
+        count, written = write_chunks(args.output, iter_chunks(lines, args.max_nodes, args.max_bytes))
+        print(f"Wrote {count} chunks, from {chunk_path(args.output, 1)}.", file=sys.stderr)
+        return written
+
+    # The output is written here, so it is counted here too.
+    def transform_bytes(data, *extra):
+        OUTPUT_BYTES.inc(write(bytes_transform(data, *extra)), transform=name)
+
+    def transform_text(data, *extra):
+        result = text_transform(str(data, "utf-8"), *extra)
+        OUTPUT_BYTES.inc(write([result.encode("utf-8")]), transform=name)
+
+    if args.budget is None:
+        # Files are batch work: no budget unless one is asked for.
+        args = argparse.Namespace(**{**vars(args), "budget": 0})
+
+    with open_input(args.input) as data:
+        if bytes_transform is not None and safe(data):
+            run(args, name, transform_bytes, data, *extra)
+        else:
+            run(args, name, transform_text, data, *extra)
@@ -1,27 +1,52 @@
+import os
 import re
+import sys
+
 import pyperclip
 
-# Get the filename from the clipboard
-filename = pyperclip.paste()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Tana Scripts"))
+
+from transform_cli import make_parser, run  # noqa: E402
+
+
+# Split off the extension, so "song.mp3" never becomes "song.mp4". An
+# all-digit suffix ("take 1.5") is part of the name, not a file type.
+def split_extension(filename):
+    stem, extension = os.path.splitext(filename)
+    if extension[1:].isdigit():
+        return filename, ""
+    return stem, extension
 
 
-# Find the last number in the filename and increment it by 1
-def increment_last_number(filename):
-    matches = list(re.finditer(r"(\d+)", filename))
+# Find the last number in the filename (before the extension) and increment
+# it by 1 (or by step), keeping any zero-padding: img_009.png -> img_010.png
+def increment_last_number(filename, step=1):
+    stem, extension = split_extension(filename)
+    matches = list(re.finditer(r"(\d+)", stem))
     if matches:
         last_match = matches[-1]
         number = last_match.group(1)
-        new_number = str(int(number) + 1)
-        new_filename = filename[: last_match.start()] + new_number + filename[last_match.end() :]
+        new_number = str(int(number) + step).zfill(len(number))
+        new_filename = stem[: last_match.start()] + new_number + stem[last_match.end() :] + extension
         return new_filename
     return filename
 
 
-# Generate the new filename
-new_filename = increment_last_number(filename)
+def main():
+    args = make_parser("Increase the last number in the filename on the clipboard.").parse_args()
+
+    # Get the filename from the clipboard
+    filename = pyperclip.paste()
+
+    # Generate the new filename
+    new_filename = run(args, "increment_filename", increment_last_number, filename)
+
+    # Place the new filename back into the clipboard
+    pyperclip.copy(new_filename)
+
+    print(f"Original filename: {filename}")
+    print(f"New filename: {new_filename}")
 
-# Place the new filename back into the clipboard
-pyperclip.copy(new_filename)
 
-print(f"Original filename: {filename}")
-print(f"New filename: {new_filename}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/opt/homebrew/bin/python3
+
+# Batch version of "Increase filename number by 1": renumbers every file in a
+# directory, e.g. shifting scan_0001.tif..scan_2000.tif up by one.
+#
+# The directory is listed once into an index. New names are computed from it
+# in one pass, checked for collisions, and ordered so that no rename ever
+# overwrites a file: chains run from the far end, and cycles are broken with
+# a temporary name.
+
+import argparse
+import fnmatch
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Tana Scripts"))
+
+from script_loader import MACOS_DIR, load_script  # noqa: E402
+
+_renamer = load_script(os.path.join(MACOS_DIR, "Increase filename number by 1.py"))
+increment_last_number = _renamer.increment_last_number
+split_extension = _renamer.split_extension
+
+NUMBER = re.compile(r"\d+")
+
+
+class RenamePlan:
+    def __init__(self, directory, renames, steps, collisions):
+        self.directory = directory
+        self.renames = renames  # {old name: new name}
+        self.steps = steps  # [(from, to)] in a safe order, including temporary names
+        self.collisions = collisions  # [(old name, new name, reason)]
+
+    def __repr__(self):
+        return f"RenamePlan({len(self.renames)} renames, {len(self.collisions)} collisions)"
+
+
+def order_renames(renames, index):
+    """
+    Orders renames so that every target is free when its rename runs.
+
+    Each name has at most one target and, because targets are unique, at most
+    one source, so the renames form simple chains and cycles. A chain is
+    applied from its free end backwards; a cycle is opened by moving one file
+    to a temporary name first.
+
+    Parameters:
+        renames (dict): {old name: new name}, with unique new names.
+        index (set): Every name currently in the directory.
+
+    Returns:
+        list: (from, to) pairs in a safe order.
+    """
+    source_of = {new: old for old, new in renames.items()}
+    steps = []
+    done = set()
+
+    def unwind(name):
+        # Walk back from the rename into name, following whoever wants the freed name.
+        while name in source_of and source_of[name] not in done:
+            old = source_of[name]
+            steps.append((old, name))
+            done.add(old)
+            name = old
+
+    # Chains: start from targets nobody currently occupies.
+    for old, new in renames.items():
+        if new not in renames:
+            unwind(new)
+
+    # Whatever is left is a cycle.
+    counter = 0
+    for old, new in renames.items():
+        if old in done:
+            continue
+        temp = f".renumber-{counter}-{old}"
+        while temp in index:
+            counter += 1
+            temp = f".renumber-{counter}-{old}"
+        counter += 1
+        steps.append((old, temp))
+        done.add(old)
+        unwind(old)
+        steps.append((temp, new))
+    return steps
+
+
+def plan_renames(directory, step=1, pattern=None):
+    """
+    Computes new names for every numbered file in a directory.
+
+    Parameters:
+        directory (str): The directory to renumber.
+        step (int): The amount to add to the last number in each name,
+            ignoring the extension. Files without a number before the
+            extension are left alone.
+        pattern (str): Optional glob; only matching files are renamed.
+
+    Returns:
+        RenamePlan: The renames, a safe order to apply them in, and any collisions.
+    """
+    with os.scandir(directory) as entries:
+        index = {}
+        for entry in entries:
+            index[entry.name] = entry.is_file()
+
+    renames = {}
+    collisions = []
+    for name, is_file in index.items():
+        if not is_file or (pattern and not fnmatch.fnmatch(name, pattern)):
+            continue
+        numbers = NUMBER.findall(split_extension(name)[0])
+        if not numbers:
+            continue
+        if int(numbers[-1]) + step < 0:
+            collisions.append((name, None, "number would go below zero"))
+            continue
+        renames[name] = increment_last_number(name, step)
+
+    targets = {}
+    for old, new in renames.items():
+        if new in targets:
+            collisions.append((old, new, f"same new name as {targets[new]}"))
+        targets[new] = old
+        if new in index and new not in renames:
+            collisions.append((old, new, "new name already exists"))
+
+    steps = [] if collisions else order_renames(renames, index)
+    return RenamePlan(directory, renames, steps, collisions)
+
+
+def apply_plan(plan):
+    """
+    Applies a plan's renames in order. Refuses to run if the plan has collisions,
+    and stops rather than overwrite a file that appeared after planning.
+    """
+    if plan.collisions:
+        raise ValueError(f"Plan has {len(plan.collisions)} collisions; nothing was renamed.")
+    for old, new in plan.steps:
+        source = os.path.join(plan.directory, old)
+        target = os.path.join(plan.directory, new)
+        if os.path.lexists(target):
+            raise FileExistsError(f"{new} appeared after planning; stopped before {old} -> {new}.")
+        os.rename(source, target)
+
+
+def benchmark(count=100_000):
+    """
+    Times planning and applying a shift-up-by-one over count files.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        width = len(str(count))
+        for i in range(1, count + 1):
+            open(os.path.join(directory, f"scan_{i:0{width}d}.tif"), "w").close()
+
+        start = time.perf_counter()
+        plan = plan_renames(directory)
+        planned = time.perf_counter()
+        apply_plan(plan)
+        applied = time.perf_counter()
+
+        print(f"{count} files: plan {planned - start:.3f}s, apply {applied - planned:.3f}s")
+        assert os.path.exists(os.path.join(directory, f"scan_{count + 1:0{width}d}.tif"))
+        assert not os.path.exists(os.path.join(directory, f"scan_{1:0{width}d}.tif"))
+
+    # Numbers in extensions are never touched.
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("clip_001.mp4", "song.mp3", "take 1.5"):
+            open(os.path.join(directory, name), "w").close()
+        plan = plan_renames(directory)
+        assert plan.renames == {"clip_001.mp4": "clip_002.mp4", "take 1.5": "take 1.6"}, plan.renames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Increase the last number in every filename in a directory.")
+    parser.add_argument("directory", nargs="?", help="directory to renumber")
+    parser.add_argument("--step", type=int, default=1, help="amount to add (negative to shift down)")
+    parser.add_argument("--match", help="only rename files matching this glob, e.g. 'scan_*.tif'")
+    parser.add_argument("--dry-run", action="store_true", help="print the renames without applying them")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="time a renumber of N generated files")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.directory:
+        parser.error("a directory is required")
+
+    plan = plan_renames(args.directory, args.step, args.match)
+    for old, new, reason in plan.collisions:
+        print(f"Collision: {old} -> {new}: {reason}")
+    if plan.collisions:
+        print("Nothing was renamed.")
+        sys.exit(1)
+
+    if args.dry_run:
+        for old, new in plan.steps:
+            print(f"{old} -> {new}")
+        print(f"{len(plan.renames)} files would be renamed.")
+        return
+
+    apply_plan(plan)
+    print(f"Renamed {len(plan.renames)} files.")
+
+
+if __name__ == "__main__":
+    main()